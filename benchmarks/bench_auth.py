@@ -0,0 +1,77 @@
+"""
+Per-request auth microbenchmark: full jwt.decode on every request (old
+get_current_user / get_current_admin) vs the verified-token TokenCache.
+
+Uses the same python-jose HS256 tokens as main.py. A pool of distinct tokens
+(one per logged-in browser) is replayed in random order, as cookies are.
+
+Usage:
+    python benchmarks/bench_auth.py --requests 200000 --sessions 1000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jose import JWTError, jwt
+
+from cache import TokenCache
+
+SECRET_KEY = "bench-secret"
+ALGORITHM = "HS256"
+
+def make_tokens(count):
+    expire = datetime.utcnow() + timedelta(days=7)
+    return [
+        jwt.encode({"sub": str(10_000_000 + i), "type": "user", "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
+        for i in range(count)
+    ]
+
+def decode_every_time(token):
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+def make_cached(cache):
+    def decode_cached(token):
+        payload = cache.get(token)
+        if payload is None:
+            try:
+                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            except JWTError:
+                return None
+            cache.set(token, payload)
+        return payload.get("sub")
+    return decode_cached
+
+def run(name, fn, stream):
+    started = time.perf_counter()
+    for token in stream:
+        fn(token)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<22} {elapsed / len(stream) * 1e6:8.2f} us/request  ({len(stream) / elapsed:,.0f} req/s)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--sessions", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    tokens = make_tokens(args.sessions)
+    stream = [rng.choice(tokens) for _ in range(args.requests)]
+
+    run("jwt.decode", decode_every_time, stream)
+    cache = TokenCache(10_000)
+    run("TokenCache", make_cached(cache), stream)
+    print(f"cache stats: {cache.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Cooldown memory benchmark: the old per-account dicts vs the array-backed
+ExpiryTable used by the cooldown store, at a large number of tracked chats.
+
+Memory is measured with tracemalloc (Python allocations only), and lookup,
+insert and sweep timings are reported for the same data.
+
+Usage:
+    python benchmarks/bench_cooldown_memory.py --chats 1000000
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import ExpiryTable
+
+# cooldown.py এর মতো একই default (cooldown import করলে database connect হয়)
+COOLDOWN_SWEEP_SLOTS = int(os.environ.get("COOLDOWN_SWEEP_SLOTS", "16384"))
+
+def chat_ids(count, rng):
+    # Private chat (ধনাত্মক) ও channel/supergroup (-100...) id মিশিয়ে
+    ids = set()
+    while len(ids) < count:
+        if rng.random() < 0.7:
+            ids.add(rng.randint(10_000_000, 7_000_000_000))
+        else:
+            ids.add(-1_000_000_000_000 - rng.randint(1, 2_000_000_000))
+    return list(ids)
+
+# Dict গুলো event থেকে আসা chat_id int object ধরে রাখে, তাই key নতুন করে তৈরি
+# করা হয় যাতে তার memory ও গোনা হয়
+def build_float_dict(ids, now):
+    # Old last_reply_times[api_id]: {chat_id: timestamp}
+    return {chat_id * 1: now - i % 7200 for i, chat_id in enumerate(ids)}
+
+def build_tuple_dict(ids, now):
+    # dict with (replied_at, expires_at) tuples
+    return {chat_id * 1: (now - i % 7200, now - i % 7200 + 3600) for i, chat_id in enumerate(ids)}
+
+def build_table(ids, now):
+    table = ExpiryTable()
+    for i, chat_id in enumerate(ids):
+        table.set(chat_id, now - i % 7200, now - i % 7200 + 3600)
+    return table
+
+def measure(name, build, ids, now):
+    # tracemalloc allocation ধীর করে, তাই সময় আলাদা build এ মাপা হয়
+    started = time.perf_counter()
+    build(ids, now)
+    build_time = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    structure = build(ids, now)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lookups = ids[:200_000]
+    started = time.perf_counter()
+    for chat_id in lookups:
+        structure.get(chat_id)
+    lookup_time = time.perf_counter() - started
+
+    print(f"{name:<28} memory={current / 1024 / 1024:8.1f} MB  peak={peak / 1024 / 1024:8.1f} MB  "
+          f"bytes/chat={current / len(ids):6.1f}  build={build_time:5.2f}s  "
+          f"lookup={lookup_time / len(lookups) * 1e9:5.0f} ns")
+    return structure
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    ids = chat_ids(args.chats, rng)
+    now = time.time()
+    print(f"chats={args.chats:,}")
+
+    measure("dict {chat_id: float}", build_float_dict, ids, now)
+    measure("dict {chat_id: (t, exp)}", build_tuple_dict, ids, now)
+    table = measure("ExpiryTable", build_table, ids, now)
+
+    # অর্ধেক entry (2 ঘণ্টার window এর পুরনো অর্ধেক) expire হয়েছে ধরে sweep,
+    # cooldown store এর মতো প্রতি call এ bounded slot
+    removed = 0
+    longest = 0.0
+    # একটি পুরো pass: প্রতিটি slot, আর delete হওয়া প্রতিটি slot একবার বেশি
+    calls = -(-(table.capacity + len(table)) // COOLDOWN_SWEEP_SLOTS)
+    for _ in range(calls):
+        started = time.perf_counter()
+        removed += table.sweep(now, COOLDOWN_SWEEP_SLOTS)
+        longest = max(longest, time.perf_counter() - started)
+    print(f"ExpiryTable sweep: removed={removed:,} left={len(table):,} "
+          f"capacity={table.capacity:,} ({table.nbytes / 1024 / 1024:.1f} MB) "
+          f"calls={calls} longest_call={longest * 1000:.1f}ms")
+
+if __name__ == "__main__":
+    main()
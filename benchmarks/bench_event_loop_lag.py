@@ -0,0 +1,100 @@
+"""
+Event loop lag benchmark for the database layer.
+
+N concurrent "bots" each read their settings in a loop while a heartbeat task
+measures how late the event loop wakes it up. With blocking pymongo calls the
+heartbeat stalls for the full Mongo round trip; offloaded to a bounded
+executor (database._run) it should stay close to zero.
+
+Every read is a real find_one round trip - the settings cache is not used, so
+the numbers show the cost of the offload itself.
+
+Runs against a scratch database on a local mongod, never the production
+cluster (database.py hard-codes that URL, so it is not imported here):
+    python benchmarks/bench_event_loop_lag.py --bots 50 --rounds 20 --mode both
+    BENCH_MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_event_loop_lag.py
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import MongoClient
+
+BENCH_MONGO_URL = os.environ.get("BENCH_MONGO_URL", "mongodb://localhost:27017")
+BENCH_DB_NAME = os.environ.get("BENCH_DB_NAME", "telegram_bot_db_bench")
+# database.py এর executor এর মতো একই size ও একই _run
+MONGO_EXECUTOR_WORKERS = int(os.environ.get("MONGO_EXECUTOR_WORKERS", "16"))
+
+HEARTBEAT_INTERVAL = 0.01
+
+client = MongoClient(BENCH_MONGO_URL, serverSelectionTimeoutMS=5000)
+settings_collection = client[BENCH_DB_NAME]["settings"]
+_mongo_executor = ThreadPoolExecutor(max_workers=MONGO_EXECUTOR_WORKERS, thread_name_prefix="mongo")
+
+async def _run(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_mongo_executor, functools.partial(fn, *args, **kwargs))
+
+async def heartbeat(samples: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        samples.append(time.perf_counter() - start - HEARTBEAT_INTERVAL)
+
+async def blocking_bot(owner_id: str, rounds: int):
+    # Old behaviour: synchronous pymongo inside an async def
+    for _ in range(rounds):
+        settings_collection.find_one({"owner_id": owner_id}, {"_id": 0})
+        await asyncio.sleep(0)
+
+async def executor_bot(owner_id: str, rounds: int):
+    for _ in range(rounds):
+        await _run(settings_collection.find_one, {"owner_id": owner_id}, {"_id": 0})
+
+async def run(mode: str, bots: int, rounds: int):
+    samples = []
+    stop = asyncio.Event()
+    hb = asyncio.create_task(heartbeat(samples, stop))
+    worker = blocking_bot if mode == "blocking" else executor_bot
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(f"bench_{i}", rounds) for i in range(bots)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await hb
+
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1] if samples else 0.0
+    print(f"[{mode}] bots={bots} rounds={rounds} total={elapsed:.2f}s "
+          f"heartbeats={len(samples)} "
+          f"lag_mean={statistics.mean(samples or [0]) * 1000:.1f}ms "
+          f"lag_p99={p99 * 1000:.1f}ms "
+          f"lag_max={(samples[-1] if samples else 0) * 1000:.1f}ms")
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bots", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--mode", choices=["blocking", "executor", "both"], default="both")
+    args = parser.parse_args()
+
+    settings_collection.create_index("owner_id", unique=True)
+    settings_collection.insert_many([
+        {"owner_id": f"bench_{i}", "active": True, "auto_reply_text": "bench", "wait_time": 3600}
+        for i in range(args.bots)
+    ])
+    try:
+        modes = ["blocking", "executor"] if args.mode == "both" else [args.mode]
+        for mode in modes:
+            await run(mode, args.bots, args.rounds)
+    finally:
+        client.drop_database(BENCH_DB_NAME)
+
+if __name__ == "__main__":
+    asyncio.run(main())
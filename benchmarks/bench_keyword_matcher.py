@@ -0,0 +1,62 @@
+"""
+Keyword matching benchmark: old per-keyword substring loop vs the compiled
+Aho-Corasick KeywordMatcher, for growing rule counts per account.
+
+Usage:
+    python benchmarks/bench_keyword_matcher.py --messages 2000
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import KeywordMatcher
+
+def random_word(rng, low=4, high=10):
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+
+def naive_match(keywords, text):
+    # Old handle_new_message behaviour
+    for keyword_data in keywords:
+        keyword = keyword_data.get("keyword", "").lower()
+        if keyword and keyword in text.lower():
+            return keyword_data
+    return None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    messages = [" ".join(random_word(rng) for _ in range(rng.randint(5, 30))) for _ in range(args.messages)]
+
+    for count in (10, 100, 1000, 10000):
+        rules = [{"keyword": random_word(rng, 6, 12), "reply": "ok"} for _ in range(count)]
+
+        started = time.perf_counter()
+        matcher = KeywordMatcher(rules)
+        matcher.match("warmup")
+        build = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for text in messages:
+            matcher.match(text)
+        compiled = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for text in messages:
+            naive_match(rules, text)
+        naive = time.perf_counter() - started
+
+        print(f"keywords={count:>6} build={build * 1000:8.1f}ms "
+              f"compiled={compiled / len(messages) * 1e6:8.1f}us/msg "
+              f"naive={naive / len(messages) * 1e6:10.1f}us/msg")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Admin login burst benchmark: Argon2 verify inline on the event loop (old
+verify_admin) vs the bounded Argon2 pool in passwords.run_hash.
+
+Only passwords.py is imported, so no database connection is opened.
+
+While a burst of concurrent password checks runs, a heartbeat task measures
+how late the event loop wakes up - the delay every Telethon handler and
+WebSocket would see during the burst. Checks that cannot get a pool slot
+within PASSWORD_HASH_QUEUE_TIMEOUT are rejected (HTTP 503 in the API).
+
+Usage:
+    python benchmarks/bench_password_hash.py --logins 20
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import passwords
+
+HEARTBEAT_INTERVAL = 0.01
+
+async def heartbeat(samples: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        samples.append(time.perf_counter() - start - HEARTBEAT_INTERVAL)
+
+async def inline_login(password_hash: str):
+    # Old behaviour: pwd_context.verify directly inside the async route
+    await asyncio.sleep(0)
+    return passwords.pwd_context.verify("correct horse", password_hash)
+
+async def pooled_login(password_hash: str):
+    try:
+        return await passwords.run_hash(passwords.pwd_context.verify, "correct horse", password_hash)
+    except passwords.PasswordHashBusy:
+        return None
+
+async def run(mode: str, logins: int, password_hash: str):
+    samples = []
+    stop = asyncio.Event()
+    hb = asyncio.create_task(heartbeat(samples, stop))
+    worker = inline_login if mode == "inline" else pooled_login
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(worker(password_hash) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await hb
+
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1] if samples else 0.0
+    print(f"[{mode}] logins={logins} total={elapsed:.2f}s "
+          f"ok={sum(1 for r in results if r)} rejected={sum(1 for r in results if r is None)} "
+          f"heartbeats={len(samples)} "
+          f"lag_mean={statistics.mean(samples or [0]) * 1000:.1f}ms "
+          f"lag_p99={p99 * 1000:.1f}ms "
+          f"lag_max={(samples[-1] if samples else 0) * 1000:.1f}ms")
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--mode", choices=["inline", "pooled", "both"], default="both")
+    args = parser.parse_args()
+
+    password_hash = passwords.pwd_context.hash("correct horse")
+    print(f"cpu_count={os.cpu_count()} workers={passwords.PASSWORD_HASH_WORKERS} "
+          f"queue_timeout={passwords.PASSWORD_HASH_QUEUE_TIMEOUT}s")
+    modes = ["inline", "pooled"] if args.mode == "both" else [args.mode]
+    for mode in modes:
+        await run(mode, args.logins, password_hash)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Sharding throughput benchmark.
+
+Runs the real sharding IPC layer (HashRing routing, ShardClient, serve) against
+worker processes whose handler does a fixed amount of CPU work per request,
+standing in for MTProto crypto and JSON serialization of a busy account.
+Throughput should grow with the number of workers up to the core count.
+
+Usage:
+    python benchmarks/bench_sharding.py --requests 2000 --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sharding
+
+BASE_PORT = 18100
+SECRET = "bench-secret"
+
+class CpuBoundTarget:
+    async def get_messages(self, api_id: str, chat_id: int, rounds: int = 2000):
+        digest = api_id.encode()
+        for _ in range(rounds):
+            digest = hashlib.sha256(digest).digest()
+        payload = [{"id": i, "text": digest.hex(), "chat_id": chat_id} for i in range(50)]
+        return json.loads(json.dumps(payload))[:1]
+
+def _worker(port: int):
+    asyncio.run(sharding.serve(CpuBoundTarget(), port, SECRET))
+
+async def run(workers: int, requests: int, rounds: int):
+    ctx = multiprocessing.get_context("spawn")
+    ports = [BASE_PORT + workers * 10 + i for i in range(workers)]
+    processes = [ctx.Process(target=_worker, args=(port,), daemon=True) for port in ports]
+    for process in processes:
+        process.start()
+
+    async def ignore_event(api_id, message):
+        return None
+
+    clients = [sharding.ShardClient(port, SECRET, ignore_event) for port in ports]
+    await asyncio.gather(*(client.connect() for client in clients))
+    ring = sharding.HashRing(workers)
+
+    api_ids = [str(10_000_000 + i) for i in range(requests)]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        clients[ring.owner(api_id)].call("get_messages", api_id, 1, rounds=rounds)
+        for api_id in api_ids
+    ))
+    elapsed = time.perf_counter() - started
+
+    per_shard = [0] * workers
+    for api_id in api_ids:
+        per_shard[ring.owner(api_id)] += 1
+    print(f"workers={workers} requests={requests} elapsed={elapsed:.2f}s "
+          f"throughput={requests / elapsed:,.0f} req/s distribution={per_shard}")
+
+    for process in processes:
+        process.terminate()
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"cpu_count={os.cpu_count()}")
+    for workers in args.workers:
+        await run(workers, args.requests, args.rounds)
+
+if __name__ == "__main__":
+    asyncio.run(main())
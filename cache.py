@@ -0,0 +1,448 @@
+"""
+ছোট in-process cache helpers - database ও BotManager দুই জায়গাতেই ব্যবহার হয়
+"""
+
+import bisect
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+class TTLCache:
+    """Per-key cache with a fixed time-to-live and hit/miss counters"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            self._data.pop(key, None)
+        self.misses += 1
+        return None
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Like get() but without touching the hit/miss counters"""
+        entry = self._data.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key: Hashable = None):
+        """Drop one key, or everything when key is None"""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+class LRUCache:
+    """Size-bounded mapping that evicts the least recently used key"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key: Hashable):
+        return key in self._data
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        return self._data.pop(key, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+class TokenCache(LRUCache):
+    """LRU of already verified token -> claims; an entry is dropped once its "exp" passes"""
+
+    def get(self, key: Hashable) -> Optional[dict]:
+        claims = self._data.get(key)
+        if claims is None or claims.get("exp", float("inf")) <= time.time():
+            if claims is not None:
+                self._data.pop(key, None)
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return claims
+
+class MessageWindow:
+    """Contiguous, id-ordered slice of one chat's history.
+
+    Every message with an id between the first and last cached id is present.
+    ``at_head`` means the newest message of the chat is cached (kept true by
+    NewMessage events), ``at_tail`` means the oldest one is.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.ids: list = []  # ascending
+        self.messages: Dict[int, dict] = {}
+        self.at_head = False
+        self.at_tail = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _trim(self):
+        if len(self.ids) > self.max_size:
+            for msg_id in self.ids[:-self.max_size]:
+                self.messages.pop(msg_id, None)
+            self.ids = self.ids[-self.max_size:]
+            self.at_tail = False
+
+    def replace(self, batch: list, at_head: bool, at_tail: bool):
+        self.messages = {m["id"]: m for m in batch}
+        self.ids = sorted(self.messages)
+        self.at_head = at_head
+        self.at_tail = at_tail
+        self._trim()
+
+    def extend_older(self, batch: list, at_tail: bool):
+        """Add a batch that ends right before the current oldest cached id"""
+        for message in batch:
+            self.messages[message["id"]] = message
+        self.ids = sorted(self.messages)
+        self.at_tail = at_tail
+        if len(self.ids) > self.max_size:
+            # Scroll back এর সময় নতুন দিক থেকে বাদ দিন
+            for msg_id in self.ids[self.max_size:]:
+                self.messages.pop(msg_id, None)
+            self.ids = self.ids[:self.max_size]
+            self.at_head = False
+
+    def add_newest(self, message: dict):
+        """Apply a NewMessage event; ignored unless the window reaches the head"""
+        if not self.at_head:
+            return
+        if message["id"] not in self.messages:
+            if self.ids and message["id"] < self.ids[-1]:
+                self.ids.append(message["id"])
+                self.ids.sort()
+            else:
+                self.ids.append(message["id"])
+        self.messages[message["id"]] = message
+        self._trim()
+
+    def update(self, message: dict):
+        if message["id"] in self.messages:
+            self.messages[message["id"]] = message
+
+    def remove(self, msg_ids):
+        removed = [i for i in msg_ids if self.messages.pop(i, None) is not None]
+        if removed:
+            self.ids = sorted(self.messages)
+
+    def latest(self, limit: int) -> list:
+        return [self.messages[i] for i in self.ids[-limit:]]
+
+    def older_than(self, before: int, limit: int) -> list:
+        idx = bisect.bisect_left(self.ids, before)
+        return [self.messages[i] for i in self.ids[max(0, idx - limit):idx]]
+
+    def newer_than(self, after: int, limit: int) -> list:
+        idx = bisect.bisect_right(self.ids, after)
+        return [self.messages[i] for i in self.ids[idx:idx + limit]]
+
+class DialogIndex:
+    """In-memory dialog list of one account, ordered by last message date"""
+
+    def __init__(self, dialogs: list, complete: bool, preview_ids: Optional[Dict[int, int]] = None):
+        self.dialogs: Dict[int, dict] = {d["id"]: d for d in dialogs}
+        # complete = Telegram থেকে সব dialog load হয়েছে
+        self.complete = complete
+        # chat_id -> preview তে দেখানো message এর id, edit/delete মেলানোর জন্য
+        self.preview_ids: Dict[int, int] = dict(preview_ids or {})
+
+    def __len__(self):
+        return len(self.dialogs)
+
+    def touch(self, chat_id: int, text: str, date: str, name: Optional[str] = None,
+              message_id: Optional[int] = None):
+        """Move a chat to the top with a new preview, adding it if unknown"""
+        dialog = self.dialogs.get(chat_id)
+        if dialog is None:
+            dialog = self.dialogs[chat_id] = {"id": chat_id, "name": name or "Unknown", "message": "", "date": ""}
+        elif name:
+            dialog["name"] = name
+        if date >= dialog["date"]:
+            dialog["message"] = text
+            dialog["date"] = date
+            if message_id is not None:
+                self.preview_ids[chat_id] = message_id
+
+    def edit(self, chat_id: int, message_id: int, text: str):
+        """Apply an edit if the edited message is the one shown as preview"""
+        dialog = self.dialogs.get(chat_id)
+        if dialog is not None and self.preview_ids.get(chat_id) == message_id:
+            dialog["message"] = text
+
+    def rename(self, chat_id: int, name: str):
+        dialog = self.dialogs.get(chat_id)
+        if dialog is not None:
+            dialog["name"] = name
+
+    def remove(self, chat_id: int, message_ids) -> bool:
+        """Clear the preview if it is one of message_ids; True when it needs a new one"""
+        dialog = self.dialogs.get(chat_id)
+        if dialog is None or self.preview_ids.get(chat_id) not in message_ids:
+            return False
+        del self.preview_ids[chat_id]
+        dialog["message"] = ""
+        return True
+
+    def set_preview(self, chat_id: int, text: str, date: str, message_id: Optional[int]):
+        """Replace the preview even with an older message (after the newest was deleted)"""
+        dialog = self.dialogs.get(chat_id)
+        if dialog is None or chat_id in self.preview_ids:
+            return
+        dialog["message"] = text
+        dialog["date"] = date
+        if message_id is not None:
+            self.preview_ids[chat_id] = message_id
+
+    def page(self, offset: int, limit: int) -> list:
+        ordered = sorted(self.dialogs.values(), key=lambda d: d["date"], reverse=True)
+        return ordered[offset:offset + limit]
+
+_EMPTY_KEY = 0
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+# Resize চলাকালে প্রতি set() এ পুরনো array এর অন্তত এতগুলো slot নতুন array এ যায়
+_MIGRATE_SLOTS = 8
+
+def _probe(keys, mask: int, shift: int, key: int) -> int:
+    # Fibonacci hashing: পরপর chat id গুলো এক জায়গায় জমা হয় না
+    index = ((key * _GOLDEN) & _MASK64) >> shift
+    while True:
+        current = keys[index]
+        if current == key or current == _EMPTY_KEY:
+            return index
+        index = (index + 1) & mask
+
+class ExpiryTable:
+    """Open-addressing hash table of int key -> (stamp, expires_at) over flat arrays.
+
+    Each slot is an int64 key plus two uint32 whole-second timestamps (16
+    bytes), instead of a dict entry plus int, tuple and float objects.
+    Expiry is rounded up so an entry never expires early. Key 0 is the empty
+    marker (Telegram never uses chat id 0).
+
+    No call does O(capacity) work on the event loop. sweep() looks at a
+    bounded number of slots per call and resumes from a cursor, deleting with
+    backward shifting so there are no tombstones. Growing and shrinking
+    allocate the new arrays and then move a few old slots per set()/sweep()
+    until the old arrays are drained; lookups check both meanwhile.
+    """
+
+    __slots__ = ("_keys", "_stamps", "_expires", "_size", "_mask", "_shift",
+                 "_old", "_migrated", "_step", "_cursor")
+
+    def __init__(self, capacity: int = 8):
+        self._size = 0
+        self._old = None
+        self._migrated = 0
+        self._step = _MIGRATE_SLOTS
+        self._cursor = 0
+        self._allocate(max(8, 1 << (capacity - 1).bit_length()))
+
+    def _allocate(self, capacity: int):
+        self._keys = array("q", bytes(8 * capacity))
+        self._stamps = array("I", bytes(4 * capacity))
+        self._expires = array("I", bytes(4 * capacity))
+        self._mask = capacity - 1
+        self._shift = 64 - (capacity.bit_length() - 1)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return self._mask + 1
+
+    @property
+    def nbytes(self) -> int:
+        total = (self._keys.itemsize + self._stamps.itemsize + self._expires.itemsize) * self.capacity
+        if self._old is not None:
+            total += sum(part.itemsize * len(part) for part in self._old[:3])
+        return total
+
+    def _find_old(self, key: int) -> int:
+        """Slot of key in the old arrays, -1 if absent or already moved/dropped"""
+        keys, _, _, mask, shift = self._old
+        index = _probe(keys, mask, shift, key)
+        if keys[index] == _EMPTY_KEY or index < self._migrated:
+            return -1
+        return index
+
+    def get(self, key: int) -> Optional[Tuple[int, int]]:
+        index = _probe(self._keys, self._mask, self._shift, key)
+        if self._keys[index] != _EMPTY_KEY:
+            return self._stamps[index], self._expires[index]
+        if self._old is not None:
+            index = self._find_old(key)
+            if index >= 0:
+                return self._old[1][index], self._old[2][index]
+        return None
+
+    def set(self, key: int, stamp: float, expires_at: float):
+        if key == _EMPTY_KEY:
+            raise ValueError("Key 0 is reserved")
+        stamps, expires = self._stamps, self._expires
+        index = _probe(self._keys, self._mask, self._shift, key)
+        if self._keys[index] == _EMPTY_KEY:
+            # এখনো না সরানো পুরনো entry জায়গাতেই update হয়, তাই key কখনো দুই array এ থাকে না
+            old_index = self._find_old(key) if self._old is not None else -1
+            if old_index >= 0:
+                _, stamps, expires, _, _ = self._old
+                index = old_index
+            else:
+                self._keys[index] = key
+                self._size += 1
+        stamps[index] = int(stamp)
+        expires[index] = -int(-expires_at // 1)
+        if self._old is not None:
+            self._migrate(self._step, None)
+        # Load factor 2/3 এর বেশি হলে probe chain লম্বা হয়
+        elif self._size * 3 >= self.capacity * 2:
+            self._resize(self.capacity * 2)
+
+    def sweep(self, now: float, slots: Optional[int] = None) -> int:
+        """Drop entries with expires_at <= now, looking at no more than `slots`
+        slots (the whole table when None); returns how many were dropped.
+
+        A bounded call resumes where the previous one stopped and ends at the
+        end of a pass, so `slots` bounds the work of a single call.
+        """
+        full = slots is None
+        budget = slots or 0
+        if full:
+            self._cursor = 0
+        removed = 0
+        while full or budget > 0:
+            if self._old is not None:
+                step = self._old[3] + 1 - self._migrated
+                if not full:
+                    step = min(step, budget)
+                    budget -= step
+                removed += self._migrate(step, now)
+                continue
+            keys, expires = self._keys, self._expires
+            mask = self._mask
+            index = self._cursor
+            while index <= mask and (full or budget > 0):
+                budget -= 1
+                key = keys[index]
+                if key != _EMPTY_KEY and expires[index] <= now:
+                    self._delete(index)
+                    removed += 1
+                    # পরের entry shift হয়ে এই slot এ আসতে পারে, তাই আবার দেখা হয়
+                    continue
+                index += 1
+            if index <= mask:
+                self._cursor = index
+                break
+            self._cursor = 0
+            # 1/16 এর কম ভরা হলে এক ধাপে 4 ভাগের 1 এ ছোট হয়
+            if self.capacity > 8 and self._size * 16 < self.capacity:
+                self._resize(self.capacity // 4)
+                if full:
+                    self._migrate(self._old[3] + 1, now)
+            break
+        return removed
+
+    def _delete(self, index: int):
+        # Backward shift: পরের যে entry গুলোর home এই hole এর আগে, তারা এক ধাপ পিছিয়ে আসে
+        keys, stamps, expires = self._keys, self._stamps, self._expires
+        mask, shift = self._mask, self._shift
+        hole = index
+        probe = index
+        while True:
+            probe = (probe + 1) & mask
+            key = keys[probe]
+            if key == _EMPTY_KEY:
+                break
+            home = ((key * _GOLDEN) & _MASK64) >> shift
+            if (probe - home) & mask >= (probe - hole) & mask:
+                keys[hole] = key
+                stamps[hole] = stamps[probe]
+                expires[hole] = expires[probe]
+                hole = probe
+        keys[hole] = _EMPTY_KEY
+        self._size -= 1
+
+    def _resize(self, capacity: int):
+        old_capacity = self.capacity
+        self._old = (self._keys, self._stamps, self._expires, self._mask, self._shift)
+        self._migrated = 0
+        self._cursor = 0
+        self._allocate(capacity)
+        # নতুন array 2/3 ভরার আগেই পুরনোটা খালি হয়: grow এ 8, 4 গুণ shrink এ 16 slot প্রতি set()
+        self._step = max(_MIGRATE_SLOTS, 4 * old_capacity // capacity)
+
+    def _migrate(self, slots: int, now: Optional[float]) -> int:
+        """Move up to `slots` old slots into the new arrays, dropping entries expired at `now`"""
+        old_keys, old_stamps, old_expires, old_mask, _ = self._old
+        keys, stamps, expires = self._keys, self._stamps, self._expires
+        mask, shift = self._mask, self._shift
+        end = min(self._migrated + slots, old_mask + 1)
+        removed = 0
+        for old_index in range(self._migrated, end):
+            key = old_keys[old_index]
+            if key == _EMPTY_KEY:
+                continue
+            if now is not None and old_expires[old_index] <= now:
+                removed += 1
+                continue
+            index = _probe(keys, mask, shift, key)
+            keys[index] = key
+            stamps[index] = old_stamps[old_index]
+            expires[index] = old_expires[old_index]
+        self._migrated = end
+        self._size -= removed
+        if end > old_mask:
+            self._old = None
+        return removed
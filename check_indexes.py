@@ -0,0 +1,83 @@
+"""
+Index regression check - INDEX_PLAN একটি খালি scratch database এ তৈরি করে
+HOT_QUERIES এর প্রতিটির explain চালায়। কোনো query collection scan (COLLSCAN)
+এ পড়লে exit code 1।
+
+Local mongod লাগে (production cluster এ চালাবেন না):
+    python check_indexes.py
+    CHECK_MONGO_URL=mongodb://localhost:27017 python check_indexes.py
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+from indexes import HOT_QUERIES, INDEX_PLAN
+
+CHECK_MONGO_URL = os.environ.get("CHECK_MONGO_URL", "mongodb://localhost:27017")
+CHECK_DB_NAME = os.environ.get("CHECK_DB_NAME", "telegram_bot_db_index_check")
+SAMPLE_DOCS = 200
+
+def sample_documents(name: str, count: int) -> list:
+    """Documents shaped like the real collections, so the planner has data to choose on"""
+    now = datetime.utcnow()
+    docs = []
+    for i in range(count):
+        owner_id = str(10000 + i % 20)
+        if name == "admin":
+            docs.append({"username": f"admin{i}", "password_hash": "x"})
+        elif name == "users":
+            docs.append({"api_id": str(10000 + i), "session_string": "1Aa" * 10 if i % 3 else ""})
+        elif name == "keywords":
+            docs.append({"owner_id": owner_id, "keyword": f"kw{i}", "reply": "hi"})
+        elif name == "settings":
+            docs.append({"owner_id": str(10000 + i), "auto_reply_enabled": True})
+        elif name == "scheduled_messages":
+            docs.append({"owner_id": owner_id, "active": i % 10 == 0, "message": "hi"})
+        elif name == "cooldowns":
+            docs.append({"owner_id": owner_id, "chat_id": i, "replied_at": 0,
+                         "expires_at": now + timedelta(hours=1)})
+    return docs
+
+def stages(plan: dict):
+    """Every stage name in an explain plan tree"""
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from stages(child)
+
+def main() -> int:
+    client = MongoClient(CHECK_MONGO_URL, serverSelectionTimeoutMS=5000)
+    client.drop_database(CHECK_DB_NAME)
+    db = client[CHECK_DB_NAME]
+    try:
+        for name, keys, options in INDEX_PLAN:
+            db[name].create_index(keys, **options)
+        for name in {name for name, _, _ in INDEX_PLAN}:
+            db[name].insert_many(sample_documents(name, SAMPLE_DOCS))
+
+        failures = 0
+        for label, name, query in HOT_QUERIES:
+            plan = db[name].find(query).explain()["queryPlanner"]["winningPlan"]
+            found = list(stages(plan))
+            ok = "COLLSCAN" not in found
+            failures += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {label:<22} {name}.find({query}) -> {' <- '.join(found)}")
+    finally:
+        client.drop_database(CHECK_DB_NAME)
+
+    if failures:
+        print(f"[ERROR] {failures} hot queries fall back to a collection scan")
+        return 1
+    print("[SUCCESS] All hot queries use an index")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Auto-reply cooldown store - কোন chat এ শেষ auto-reply কখন গেছে তা রাখে।
+
+    memory - শুধু process memory তে, restart এ হারায়
+    mongo  - memory তেই lookup হয়, পরিবর্তন write-behind করে Mongo TTL
+             collection এ যায় এবং startup এ একবারে load হয় (default)
+
+প্রতিটি entry তার wait_time পার হলে expire হয়, তাই memory ও collection
+কোনোটাই সীমাহীন বাড়ে না। Sharding এ প্রতিটি worker শুধু নিজের account গুলোর
+entry load করে, তাই worker দের মধ্যে প্রতি message এ কোনো shared lookup নেই।
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import database as db
+from cache import ExpiryTable
+
+logger = logging.getLogger(__name__)
+
+COOLDOWN_STORE = os.environ.get("COOLDOWN_STORE", "mongo").lower()
+COOLDOWN_FLUSH_INTERVAL = float(os.environ.get("COOLDOWN_FLUSH_INTERVAL", "5"))
+COOLDOWN_SWEEP_INTERVAL = float(os.environ.get("COOLDOWN_SWEEP_INTERVAL", "5"))
+# প্রতি sweep এ প্রতিটি account এর table এর সর্বোচ্চ কয়টি slot দেখা হবে
+COOLDOWN_SWEEP_SLOTS = int(os.environ.get("COOLDOWN_SWEEP_SLOTS", "16384"))
+
+class MemoryCooldownStore:
+    """Per-account ExpiryTable of chat_id -> (replied_at, expires_at), swept periodically"""
+
+    backend = "memory"
+
+    def __init__(self):
+        self._tables: Dict[str, ExpiryTable] = {}
+        self._last_sweep = time.time()
+
+    def __len__(self):
+        return sum(len(table) for table in self._tables.values())
+
+    def last_reply(self, api_id: str, chat_id: int) -> float:
+        """Timestamp of the last auto-reply to chat_id, 0 if none or expired"""
+        table = self._tables.get(api_id)
+        entry = table.get(chat_id) if table is not None else None
+        if entry is None or entry[1] <= time.time():
+            return 0.0
+        return entry[0]
+
+    def _set(self, api_id: str, chat_id: int, replied_at: float, expires_at: float):
+        table = self._tables.get(api_id)
+        if table is None:
+            table = self._tables[api_id] = ExpiryTable()
+        table.set(chat_id, replied_at, expires_at)
+
+    def record(self, api_id: str, chat_id: int, replied_at: float, wait_time: float):
+        self._set(api_id, chat_id, replied_at, replied_at + wait_time)
+
+    def sweep(self, now: Optional[float] = None, slots: Optional[int] = COOLDOWN_SWEEP_SLOTS) -> int:
+        """Drop expired entries, at most `slots` slots per account table; returns how many were removed"""
+        now = now or time.time()
+        removed = 0
+        for api_id in list(self._tables):
+            table = self._tables[api_id]
+            removed += table.sweep(now, slots)
+            if not table:
+                del self._tables[api_id]
+        return removed
+
+    async def load(self) -> int:
+        return 0
+
+    async def flush(self) -> int:
+        return 0
+
+    async def run(self):
+        """Background loop: write-behind flush and expiry sweeps"""
+        while True:
+            await asyncio.sleep(COOLDOWN_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Cooldown flush error: {e}")
+            now = time.time()
+            if now - self._last_sweep >= COOLDOWN_SWEEP_INTERVAL:
+                removed = self.sweep(now)
+                self._last_sweep = now
+                if removed:
+                    logger.info(f"[COOLDOWN] Swept {removed} expired entries ({len(self)} left)")
+
+class MongoCooldownStore(MemoryCooldownStore):
+    """Memory store whose writes are batched into a Mongo TTL collection"""
+
+    backend = "mongo"
+
+    def __init__(self, owns: Optional[Callable[[str], bool]] = None):
+        super().__init__()
+        self._owns = owns or (lambda api_id: True)
+        # (api_id, chat_id) -> (replied_at, expires_at), পরের flush পর্যন্ত শুধু শেষ value
+        self._pending: Dict[Tuple[str, int], Tuple[float, float]] = {}
+
+    def record(self, api_id: str, chat_id: int, replied_at: float, wait_time: float):
+        super().record(api_id, chat_id, replied_at, wait_time)
+        self._pending[(api_id, chat_id)] = (replied_at, replied_at + wait_time)
+
+    async def load(self) -> int:
+        """Bulk-load unexpired cooldowns of the accounts this process owns"""
+        loaded = 0
+        for row in await db.get_active_cooldowns():
+            if not self._owns(row["owner_id"]):
+                continue
+            self._set(row["owner_id"], row["chat_id"], row["replied_at"], row["expires_at"])
+            loaded += 1
+        logger.info(f"[COOLDOWN] Loaded {loaded} active cooldowns")
+        return loaded
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            await db.save_cooldowns([
+                (api_id, chat_id, replied_at, expires_at)
+                for (api_id, chat_id), (replied_at, expires_at) in batch.items()
+            ])
+        except Exception:
+            # পরের flush এ আবার চেষ্টা, এর মধ্যে আসা নতুন value টাই রাখা হয়
+            for key, value in batch.items():
+                self._pending.setdefault(key, value)
+            raise
+        return len(batch)
+
+def create_store(owns: Optional[Callable[[str], bool]] = None) -> MemoryCooldownStore:
+    if COOLDOWN_STORE == "memory":
+        return MemoryCooldownStore()
+    return MongoCooldownStore(owns)
@@ -1,13 +1,21 @@
 import os
-from passlib.context import CryptContext
-from datetime import datetime
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from bson.objectid import ObjectId
 from jose import jwt
-from typing import Optional
+from typing import AsyncIterator, Optional
+
+from cache import TTLCache
+from indexes import ACTIVE_SCHEDULE_FILTER, INDEX_PLAN, SESSION_FILTER
+from keyword_matcher import KeywordMatcher, normalize_rule
+from passwords import PasswordHashBusy, hash_password, verify_password
 
 # PyMongo ব্যবহার করুন (motor এর পরিবর্তে)
 try:
-    from pymongo import MongoClient
+    from pymongo import MongoClient, UpdateOne
     from pymongo.errors import ConnectionFailure
     USE_MOTOR = False
 except ImportError:
@@ -22,15 +30,51 @@ DB_NAME = "telegram_bot_db"
 client = MongoClient(MONGO_URL)
 db = client[DB_NAME]
 
+# PyMongo blocking, তাই সব call একটি bounded thread pool এ চালানো হয় যাতে
+# event loop (Telethon clients, WebSocket, FastAPI routes) আটকে না যায়।
+# Pool size pymongo এর connection pool (default 100) এর চেয়ে ছোট রাখুন।
+MONGO_EXECUTOR_WORKERS = int(os.environ.get("MONGO_EXECUTOR_WORKERS", "16"))
+_mongo_executor = ThreadPoolExecutor(
+    max_workers=MONGO_EXECUTOR_WORKERS,
+    thread_name_prefix="mongo"
+)
+
+async def _run(fn, *args, **kwargs):
+    """Run a blocking pymongo call on the Mongo executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_mongo_executor, functools.partial(fn, *args, **kwargs))
+
+async def _find_list(collection, *args, **kwargs):
+    """Run find() and exhaust the cursor inside the executor"""
+    return await _run(lambda: list(collection.find(*args, **kwargs)))
+
+# Settings ও keywords প্রতিটি incoming message এ লাগে, তাই per-owner cache।
+# Write operations explicit invalidate করে, TTL শুধু অন্য process এর edit এর জন্য।
+SETTINGS_CACHE_TTL = int(os.environ.get("SETTINGS_CACHE_TTL", "300"))
+CACHE_CHANGE_STREAM = os.environ.get("CACHE_CHANGE_STREAM", "false").lower() == "true"
+
+_settings_cache = TTLCache(SETTINGS_CACHE_TTL)
+_keywords_cache = TTLCache(SETTINGS_CACHE_TTL)
+_matcher_cache = TTLCache(SETTINGS_CACHE_TTL)
+
+# users document ও decode করা credential, প্রতি api_id একটি record - get_client
+# এর প্রতিটি reconnect/lazy activation এ লাগে। register_user_login নিজের লেখা
+# value দিয়ে update করে (write-behind, নিচে দেখুন)।
+USER_RECORD_CACHE_TTL = int(os.environ.get("USER_RECORD_CACHE_TTL", "600"))
+_user_cache = TTLCache(USER_RECORD_CACHE_TTL)
+
+# Admin আছে কিনা ও admin document - প্রতিটি admin route এ লাগে। Setup ও password
+# change invalidate করে, TTL শুধু reset_admin.py এর মতো বাইরের পরিবর্তনের জন্য।
+ADMIN_CACHE_TTL = int(os.environ.get("ADMIN_CACHE_TTL", "300"))
+_admin_cache = TTLCache(ADMIN_CACHE_TTL)
+
 # Collections
 admin_collection = db["admin"]
 users_collection = db["users"]
 keywords_collection = db["keywords"]
 settings_collection = db["settings"]
 scheduled_messages_collection = db["scheduled_messages"]
-
-# Password Hashing
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+cooldowns_collection = db["cooldowns"]
 
 # JWT Configuration for Credentials Encoding
 CREDENTIALS_SECRET = "credentials_secret_key_change_in_production_2026"
@@ -77,13 +121,16 @@ async def init_db():
     """Initialize database - async version"""
     try:
         # Check connection
-        client.admin.command('ping')
+        await _run(client.admin.command, 'ping')
         print("Database connection successful")
         
-        # Create indexes
-        users_collection.create_index("api_id", unique=True)
-        keywords_collection.create_index([("owner_id", 1), ("keyword", 1)], unique=True)
-        settings_collection.create_index("owner_id", unique=True)
+        # Create indexes (indexes.py এর plan অনুযায়ী)
+        for name, keys, options in INDEX_PLAN:
+            try:
+                await _run(db[name].create_index, keys, **options)
+            except Exception as e:
+                # একটি index ব্যর্থ হলেও (যেমন পুরনো duplicate data) বাকিগুলো তৈরি হোক
+                print(f"[WARNING] Could not create index {keys} on {name}: {e}")
         print("Database indexes created")
         return True
     except Exception as e:
@@ -91,103 +138,156 @@ async def init_db():
         return False
 
 async def admin_exists():
-    count = admin_collection.count_documents({})
-    return count > 0
+    exists = _admin_cache.get("exists")
+    if exists is None:
+        exists = await _run(admin_collection.count_documents, {}, limit=1) > 0
+        _admin_cache.set("exists", exists)
+    return exists
 
 async def create_initial_admin(username, password):
     if await admin_exists():
         raise Exception("Admin already exists")
     
-    password_hash = pwd_context.hash(password)
-    admin_collection.insert_one({
+    password_hash = await hash_password(password)
+    await _run(admin_collection.insert_one, {
         "username": username,
         "password_hash": password_hash,
         "must_change_password": False,
         "created_at": datetime.utcnow()
     })
+    _admin_cache.invalidate()
     return True
 
 # --- Admin Operations ---
 async def verify_admin(username, password):
-    user = admin_collection.find_one({"username": username})
+    user = await _run(admin_collection.find_one, {"username": username})
     if not user:
         return None
-    if not pwd_context.verify(password, user["password_hash"]):
+    if not await verify_password(password, user["password_hash"]):
         return None
     return user
 
+async def get_admin(username):
+    key = ("admin", username)
+    admin = _admin_cache.get(key)
+    if admin is None:
+        admin = await _run(admin_collection.find_one, {"username": username})
+        if admin:
+            _admin_cache.set(key, admin)
+    return admin
+
 async def change_admin_password(username, new_password):
-    new_hash = pwd_context.hash(new_password)
-    admin_collection.update_one(
+    new_hash = await hash_password(new_password)
+    await _run(
+        admin_collection.update_one,
         {"username": username},
         {"$set": {"password_hash": new_hash, "must_change_password": False}}
     )
+    _admin_cache.invalidate()
 
 async def get_all_users():
-    cursor = users_collection.find({}, {"_id": 0})
-    return list(cursor)
+    return await _find_list(users_collection, {}, {"_id": 0})
 
 # --- User/Bot Operations ---
-async def register_user_login(api_id, api_hash, first_name=None, username=None, phone_number=None, session_string=None):
-    """Update last login for a user"""
+# register_user_login প্রতিটি get_client connect/reconnect এ আসে, startup এ প্রতিটি
+# account এর জন্য। পরিবর্তন না থাকলে write হয় না; থাকলে api_id প্রতি শেষ update
+# টা buffer এ থাকে এবং interval বা batch size এ একটি bulk_write এ যায়।
+USER_WRITE_FLUSH_INTERVAL = float(os.environ.get("USER_WRITE_FLUSH_INTERVAL", "2"))
+USER_WRITE_BATCH_SIZE = int(os.environ.get("USER_WRITE_BATCH_SIZE", "200"))
+_pending_user_writes: dict = {}
+_user_writes_wanted: Optional[asyncio.Event] = None
+
+def _user_writes_event() -> asyncio.Event:
+    global _user_writes_wanted
+    if _user_writes_wanted is None:
+        _user_writes_wanted = asyncio.Event()
+    return _user_writes_wanted
+
+async def register_user_login(api_id, api_hash, first_name=None, username=None, phone_number=None, session_string=None, flush=False):
+    """Record a login/reconnect; unchanged logins are skipped, changes are written behind.
+    flush=True writes immediately (new logins, so the session survives a crash)"""
+    fields = {"first_name": first_name, "username": username}
+    if phone_number:
+        fields["phone_number"] = phone_number
+    if session_string:
+        fields["session_string"] = session_string
+    
+    record = _user_cache.peek(api_id)
+    user = record["user"] if record else None
+    same_hash = record is not None and record["credentials"].get("api_hash") == api_hash
+    if same_hash and all(user.get(key) == value for key, value in fields.items()):
+        if flush and api_id in _pending_user_writes:
+            return await flush_user_logins()
+        return True
+    
     print(f"🔥 Saving user {api_id} to database")
     
-    # Encode credentials as JWT
-    encoded_creds = encode_credentials(api_id, api_hash)
+    # Encode credentials as JWT (api_hash না বদলালে আগের JWT ই চলে)
+    if same_hash and user.get("api_id_jwt") and user.get("api_hash_jwt"):
+        encoded_creds = {"api_id_jwt": user["api_id_jwt"], "api_hash_jwt": user["api_hash_jwt"]}
+    else:
+        encoded_creds = encode_credentials(api_id, api_hash)
     
+    now = datetime.utcnow()
     update_data = {
         "api_id": api_id,
         "api_id_jwt": encoded_creds["api_id_jwt"],
         "api_hash_jwt": encoded_creds["api_hash_jwt"],
-        "first_name": first_name,
-        "username": username,
-        "last_login": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
+        **fields,
+        "last_login": now,
+        "updated_at": now
     }
+    _pending_user_writes[api_id] = {**_pending_user_writes.get(api_id, {}), **update_data}
     
-    if phone_number:
-        update_data["phone_number"] = phone_number
-    if session_string:
-        update_data["session_string"] = session_string
-        print(f"[SUCCESS] Session saved to DB for {api_id}")
+    # Flush এর আগের read ও যাতে নতুন value দেখে
+    if user is not None:
+        _user_cache.set(api_id, {
+            "user": {**user, **update_data},
+            "credentials": {"api_id": api_id, "api_hash": api_hash}
+        })
+    else:
+        _user_cache.invalidate(api_id)
     
+    if flush:
+        return await flush_user_logins()
+    if len(_pending_user_writes) >= USER_WRITE_BATCH_SIZE:
+        _user_writes_event().set()
+    return True
+
+async def flush_user_logins() -> bool:
+    """Write all buffered users upserts in one bulk_write"""
+    if not _pending_user_writes:
+        return True
+    batch = dict(_pending_user_writes)
+    _pending_user_writes.clear()
     try:
-        result = users_collection.update_one(
-            {"api_id": api_id},
-            {"$set": update_data},
-            upsert=True
+        await _run(
+            users_collection.bulk_write,
+            [UpdateOne({"api_id": api_id}, {"$set": data}, upsert=True) for api_id, data in batch.items()],
+            ordered=False
         )
-        print(f"[SUCCESS] User {api_id} saved/updated")
-        return True
     except Exception as e:
-        print(f"[ERROR] Error saving user {api_id}: {e}")
+        # পরের flush এ আবার চেষ্টা, এর মধ্যে আসা নতুন field গুলোই রাখা হয়
+        for api_id, data in batch.items():
+            _pending_user_writes[api_id] = {**data, **_pending_user_writes.get(api_id, {})}
+        print(f"[ERROR] Error saving {len(batch)} users: {e}")
         return False
+    print(f"[SUCCESS] {len(batch)} users saved/updated")
+    return True
 
-async def get_user_session(api_id):
-    user = users_collection.find_one({"api_id": api_id})
-    if user:
-        print(f"📥 Fetched user session for {api_id}")
-    return user
-
-async def get_api_hash(api_id: str) -> Optional[str]:
-    """Get decrypted API hash for a user"""
-    decoded = await decode_user_credentials(api_id)
-    if decoded:
-        return decoded.get("api_hash")
-    
-    # Fallback to direct storage
-    user = users_collection.find_one({"api_id": api_id})
-    if user and "api_hash" in user:
-        return user["api_hash"]
-    return None
+async def user_login_flush_loop():
+    """Background loop: flush buffered users upserts every interval or once the batch is full"""
+    event = _user_writes_event()
+    while True:
+        try:
+            await asyncio.wait_for(event.wait(), USER_WRITE_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        event.clear()
+        await flush_user_logins()
 
-async def decode_user_credentials(api_id: str) -> Optional[dict]:
-    """Get and decode user credentials from JWT"""
-    user = users_collection.find_one({"api_id": api_id})
-    if not user:
-        print(f"[ERROR] User {api_id} not found in database")
-        return None
-    
+def _credentials_from_user(user: dict) -> dict:
+    """Decode a users document's credentials, falling back to plain text storage"""
     # Try JWT encoded credentials first
     if "api_id_jwt" in user and "api_hash_jwt" in user:
         try:
@@ -197,21 +297,105 @@ async def decode_user_credentials(api_id: str) -> Optional[dict]:
         except Exception as e:
             print(f"[WARNING] JWT decode failed: {e}")
     
-    # Fallback to plain text storage
     return {
         "api_id": user.get("api_id"),
         "api_hash": user.get("api_hash")  # May be None
     }
 
+async def get_user_record(api_id: str) -> Optional[dict]:
+    """{"user": users document, "credentials": decoded credentials}, one query per cache miss"""
+    record = _user_cache.get(api_id)
+    if record is not None:
+        return record
+    
+    user = await _run(users_collection.find_one, {"api_id": api_id})
+    pending = _pending_user_writes.get(api_id)
+    if pending:
+        # এখনো flush না হওয়া login
+        user = {**(user or {}), **pending}
+    if not user:
+        return None
+    record = {"user": user, "credentials": _credentials_from_user(user)}
+    _user_cache.set(api_id, record)
+    return record
+
+async def get_user_session(api_id):
+    record = await get_user_record(api_id)
+    return record["user"] if record else None
+
+async def get_api_hash(api_id: str) -> Optional[str]:
+    """Get decrypted API hash for a user"""
+    record = await get_user_record(api_id)
+    return record["credentials"].get("api_hash") if record else None
+
+async def decode_user_credentials(api_id: str) -> Optional[dict]:
+    """Get and decode user credentials from JWT"""
+    record = await get_user_record(api_id)
+    if not record:
+        print(f"[ERROR] User {api_id} not found in database")
+        return None
+    return record["credentials"]
+
+# Startup এ সব saved session একটি projected cursor থেকে batch এ আসে। প্রতিটি
+# record (decode করা credential সহ) users cache এ বসে, তাই boot এর সময় per-account
+# get_api_hash / get_user_session আর আলাদা query করে না।
+BOOT_BATCH_SIZE = int(os.environ.get("BOOT_BATCH_SIZE", "200"))
+BOOT_PROJECTION = {
+    "_id": 0,
+    "api_id": 1,
+    "api_id_jwt": 1,
+    "api_hash_jwt": 1,
+    "api_hash": 1,
+    "session_string": 1,
+    "first_name": 1,
+    "username": 1,
+    "phone_number": 1,
+    "last_login": 1
+}
+
+def _next_boot_batch(cursor, owns) -> list:
+    """Pull up to BOOT_BATCH_SIZE owned documents and decode their credentials (runs in the executor)"""
+    batch = []
+    for user in cursor:
+        api_id = user.get("api_id")
+        if not api_id or not owns(api_id):
+            continue
+        batch.append({"user": user, "credentials": _credentials_from_user(user)})
+        if len(batch) >= BOOT_BATCH_SIZE:
+            break
+    return batch
+
+async def iter_boot_records(owns=None) -> AsyncIterator[dict]:
+    """Stream {"user", "credentials"} records of every saved session from one cursor"""
+    owns = owns or (lambda api_id: True)
+    cursor = users_collection.find(
+        SESSION_FILTER,
+        BOOT_PROJECTION,
+        batch_size=BOOT_BATCH_SIZE
+    )
+    try:
+        while True:
+            batch = await _run(_next_boot_batch, cursor, owns)
+            if not batch:
+                break
+            for record in batch:
+                _user_cache.set(record["user"]["api_id"], record)
+                yield record
+    finally:
+        await _run(cursor.close)
+
 async def get_all_sessions():
     """Retrieve all users who have a saved session string"""
-    cursor = users_collection.find({"session_string": {"$ne": None, "$ne": ""}}, {"_id": 0})
-    return list(cursor)
+    return await _find_list(users_collection, SESSION_FILTER, {"_id": 0})
 
 # --- Settings Per User ---
 async def get_settings(owner_id: str):
     owner_id = str(owner_id)
-    settings = settings_collection.find_one({"owner_id": owner_id}, {"_id": 0})
+    cached = _settings_cache.get(owner_id)
+    if cached is not None:
+        return cached
+    
+    settings = await _run(settings_collection.find_one, {"owner_id": owner_id}, {"_id": 0})
     if not settings:
         # Default settings
         default_settings = {
@@ -221,8 +405,11 @@ async def get_settings(owner_id: str):
             "owner_id": owner_id,
             "created_at": datetime.utcnow()
         }
-        settings_collection.insert_one(default_settings)
-        return default_settings
+        # insert_one দেওয়া dict এ _id যোগ করে, তাই copy পাঠান
+        await _run(settings_collection.insert_one, dict(default_settings))
+        settings = default_settings
+    
+    _settings_cache.set(owner_id, settings)
     return settings
 
 async def update_settings(owner_id: str, new_settings: dict):
@@ -230,47 +417,126 @@ async def update_settings(owner_id: str, new_settings: dict):
     new_settings["owner_id"] = owner_id
     new_settings["updated_at"] = datetime.utcnow()
     
-    settings_collection.update_one(
+    await _run(
+        settings_collection.update_one,
         {"owner_id": owner_id},
         {"$set": new_settings},
         upsert=True
     )
+    _settings_cache.invalidate(owner_id)
     return await get_settings(owner_id)
 
 # --- Keywords Per User ---
 async def get_keywords(owner_id: str):
     owner_id = str(owner_id)
-    cursor = keywords_collection.find({"owner_id": owner_id}, {"_id": 0})
-    return list(cursor)
+    cached = _keywords_cache.get(owner_id)
+    if cached is not None:
+        return cached
+    
+    keywords = await _find_list(keywords_collection, {"owner_id": owner_id}, {"_id": 0})
+    _keywords_cache.set(owner_id, keywords)
+    return keywords
+
+async def get_keyword_matcher(owner_id: str) -> KeywordMatcher:
+    """Compiled keyword matcher for an owner, kept in sync by add/delete_keyword"""
+    owner_id = str(owner_id)
+    matcher = _matcher_cache.get(owner_id)
+    if matcher is None:
+        matcher = KeywordMatcher(await get_keywords(owner_id))
+        _matcher_cache.set(owner_id, matcher)
+    return matcher
 
-async def add_keyword(owner_id: str, keyword: str, reply: str):
+async def add_keyword(owner_id: str, keyword: str, reply: str, match_type: str = "substring",
+                      case_sensitive: bool = False, priority: int = 0):
+    """Save a keyword rule; raises ValueError for an unknown match type or bad regex"""
     owner_id = str(owner_id)
-    keyword = keyword.lower().strip()
+    rule = normalize_rule({
+        "owner_id": owner_id,
+        "keyword": keyword,
+        "reply": reply,
+        "match_type": match_type,
+        "case_sensitive": case_sensitive,
+        "priority": priority,
+        "created_at": datetime.utcnow()
+    })
     
-    keywords_collection.update_one(
-        {"owner_id": owner_id, "keyword": keyword},
-        {
-            "$set": {
-                "owner_id": owner_id,
-                "keyword": keyword,
-                "reply": reply,
-                "created_at": datetime.utcnow()
-            }
-        },
+    await _run(
+        keywords_collection.update_one,
+        {"owner_id": owner_id, "keyword": rule["keyword"]},
+        {"$set": rule},
         upsert=True
     )
+    _keywords_cache.invalidate(owner_id)
+    matcher = _matcher_cache.peek(owner_id)
+    if matcher is not None:
+        matcher.add(rule)
 
 async def delete_keyword(owner_id: str, keyword: str):
     owner_id = str(owner_id)
-    keyword = keyword.lower().strip()
+    keyword = keyword.strip()
     
-    keywords_collection.delete_one({"owner_id": owner_id, "keyword": keyword})
+    # Case-sensitive ও regex rule যেমন লেখা তেমন save হয়, বাকিগুলো lowercase এ
+    for candidate in dict.fromkeys((keyword, keyword.lower())):
+        result = await _run(keywords_collection.delete_one, {"owner_id": owner_id, "keyword": candidate})
+        if result.deleted_count:
+            keyword = candidate
+            break
+    
+    _keywords_cache.invalidate(owner_id)
+    matcher = _matcher_cache.peek(owner_id)
+    if matcher is not None:
+        matcher.remove(keyword)
+
+# --- Cache Invalidation ---
+def invalidate_owner_caches(owner_id: str):
+    """Drop an owner's cached settings, keywords and matcher after another process changed them"""
+    owner_id = str(owner_id)
+    for cache in (_settings_cache, _keywords_cache, _matcher_cache):
+        cache.invalidate(owner_id)
+
+def cache_stats() -> dict:
+    return {
+        "settings": _settings_cache.stats(),
+        "keywords": _keywords_cache.stats(),
+        "keyword_matchers": _matcher_cache.stats(),
+        "users": _user_cache.stats(),
+        "admin": _admin_cache.stats()
+    }
+
+def _watch_collection(collection, caches):
+    """Blocking change-stream loop; runs in its own daemon thread"""
+    try:
+        with collection.watch(full_document="updateLookup") as stream:
+            for change in stream:
+                owner_id = (change.get("fullDocument") or {}).get("owner_id")
+                # Delete event এ fullDocument থাকে না, তাই পুরো cache বাদ দিন
+                for cache in caches:
+                    cache.invalidate(owner_id)
+    except Exception as e:
+        print(f"[WARNING] Change stream on {collection.name} stopped: {e}")
+
+def start_change_stream_listener():
+    """Invalidate settings/keyword caches when another process edits them (replica set only)"""
+    if not CACHE_CHANGE_STREAM:
+        return False
+    watched = (
+        (settings_collection, (_settings_cache,)),
+        (keywords_collection, (_keywords_cache, _matcher_cache))
+    )
+    for collection, caches in watched:
+        threading.Thread(
+            target=_watch_collection,
+            args=(collection, caches),
+            name=f"watch-{collection.name}",
+            daemon=True
+        ).start()
+    print("Cache change stream listener started")
+    return True
 
 # --- Scheduled Messages ---
 async def get_scheduled_messages(owner_id: str):
     owner_id = str(owner_id)
-    cursor = scheduled_messages_collection.find({"owner_id": owner_id})
-    messages = list(cursor)
+    messages = await _find_list(scheduled_messages_collection, {"owner_id": owner_id})
     
     # Convert ObjectId to string for JSON
     for msg in messages:
@@ -279,7 +545,14 @@ async def get_scheduled_messages(owner_id: str):
     
     return messages
 
+async def get_scheduled_message(owner_id: str, msg_id: str):
+    return await _run(
+        scheduled_messages_collection.find_one,
+        {"_id": ObjectId(msg_id), "owner_id": str(owner_id)}
+    )
+
 async def add_scheduled_message(owner_id: str, data: dict):
+    """Insert or update a schedule and return its id"""
     owner_id = str(owner_id)
     data["owner_id"] = owner_id
     data["last_sent_date"] = None
@@ -287,25 +560,68 @@ async def add_scheduled_message(owner_id: str, data: dict):
     
     if "_id" in data:
         msg_id = data.pop("_id")
-        scheduled_messages_collection.update_one(
+        await _run(
+            scheduled_messages_collection.update_one,
             {"_id": ObjectId(msg_id), "owner_id": owner_id},
             {"$set": data}
         )
+        return msg_id
     else:
-        scheduled_messages_collection.insert_one(data)
+        result = await _run(scheduled_messages_collection.insert_one, data)
+        return str(result.inserted_id)
 
 async def delete_scheduled_message(owner_id: str, msg_id: str):
     owner_id = str(owner_id)
-    scheduled_messages_collection.delete_one(
+    await _run(
+        scheduled_messages_collection.delete_one,
         {"_id": ObjectId(msg_id), "owner_id": owner_id}
     )
 
 async def get_all_active_scheduled_messages():
-    cursor = scheduled_messages_collection.find({"active": True})
-    return list(cursor)
+    return await _find_list(scheduled_messages_collection, ACTIVE_SCHEDULE_FILTER)
 
-async def mark_scheduled_message_sent(msg_id: str, date_str: str):
-    scheduled_messages_collection.update_one(
+async def mark_scheduled_message_sent(msg_id: str, date_str: str, deliveries: list = None):
+    update = {"last_sent_date": date_str}
+    if deliveries is not None:
+        update["last_delivery"] = {
+            "date": date_str,
+            "sent": sum(1 for d in deliveries if d.get("status") == "sent"),
+            "failed": sum(1 for d in deliveries if d.get("status") != "sent"),
+            "recipients": deliveries,
+            "finished_at": datetime.utcnow()
+        }
+    await _run(
+        scheduled_messages_collection.update_one,
         {"_id": ObjectId(msg_id)},
-        {"$set": {"last_sent_date": date_str}}
-    )
\ No newline at end of file
+        {"$set": update}
+    )
+
+# --- Auto-reply cooldowns ---
+async def save_cooldowns(entries: list):
+    """Upsert (owner_id, chat_id, replied_at, expires_at) tuples in one bulk write"""
+    if not entries:
+        return
+    operations = [
+        UpdateOne(
+            {"owner_id": owner_id, "chat_id": chat_id},
+            {"$set": {
+                "replied_at": replied_at,
+                "expires_at": datetime.utcfromtimestamp(expires_at)
+            }},
+            upsert=True
+        )
+        for owner_id, chat_id, replied_at, expires_at in entries
+    ]
+    await _run(cooldowns_collection.bulk_write, operations, ordered=False)
+
+async def get_active_cooldowns() -> list:
+    """Unexpired cooldowns with expires_at as a UNIX timestamp"""
+    rows = await _find_list(
+        cooldowns_collection,
+        # TTL monitor প্রতি ৬০ সেকেন্ডে চলে, তাই মেয়াদ শেষ হওয়াগুলো নিজেরা বাদ দিন
+        {"expires_at": {"$gt": datetime.utcnow()}},
+        {"_id": 0, "owner_id": 1, "chat_id": 1, "replied_at": 1, "expires_at": 1}
+    )
+    for row in rows:
+        row["expires_at"] = row["expires_at"].replace(tzinfo=timezone.utc).timestamp()
+    return rows
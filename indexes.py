@@ -0,0 +1,51 @@
+"""
+Index plan - database.py এর প্রতিটি query কোন index ব্যবহার করবে।
+
+init_db এই plan থেকে index তৈরি করে, আর check_indexes.py একটি local mongod এ
+HOT_QUERIES এর explain চালিয়ে দেখে কোনোটি collection scan এ পড়ছে কিনা। নতুন
+query যোগ করলে এখানে তার index ও hot query দুটোই যোগ করুন।
+"""
+
+from datetime import datetime
+
+# Query filter ও partial index এর filter একই dict, যাতে planner partial index
+# ব্যবহার করতে পারে ($ne/$nin partial index এ চলে না)। "$gt": "" শুধু
+# non-empty string মেলায়, None/missing/"" বাদ যায়।
+SESSION_FILTER = {"session_string": {"$gt": ""}}
+ACTIVE_SCHEDULE_FILTER = {"active": True}
+
+# (collection, keys, options)
+INDEX_PLAN = [
+    # verify_admin / get_admin / change_admin_password
+    ("admin", [("username", 1)], {"unique": True}),
+    # get_user_record, register_user_login
+    ("users", [("api_id", 1)], {"unique": True}),
+    # iter_boot_records / get_all_sessions: শুধু saved session আছে এমন user
+    ("users", [("session_string", 1)], {"partialFilterExpression": SESSION_FILTER}),
+    # get_keywords (owner_id prefix), add_keyword / delete_keyword
+    ("keywords", [("owner_id", 1), ("keyword", 1)], {"unique": True}),
+    # get_settings / update_settings
+    ("settings", [("owner_id", 1)], {"unique": True}),
+    # get_scheduled_messages, এবং _id + owner_id এর single-document operation
+    ("scheduled_messages", [("owner_id", 1)], {}),
+    # Scheduler loop: শুধু active schedule index এ থাকে
+    ("scheduled_messages", [("active", 1)], {"partialFilterExpression": ACTIVE_SCHEDULE_FILTER}),
+    # save_cooldowns upsert
+    ("cooldowns", [("owner_id", 1), ("chat_id", 1)], {"unique": True}),
+    # get_active_cooldowns; expires_at পার হলে MongoDB নিজেই document মুছে দেয়
+    ("cooldowns", [("expires_at", 1)], {"expireAfterSeconds": 0}),
+]
+
+# (name, collection, filter) - প্রতিটি IXSCAN এ চলতে হবে
+HOT_QUERIES = [
+    ("admin by username", "admin", {"username": "admin"}),
+    ("user record", "users", {"api_id": "12345"}),
+    ("saved sessions", "users", SESSION_FILTER),
+    ("keywords of owner", "keywords", {"owner_id": "12345"}),
+    ("keyword upsert", "keywords", {"owner_id": "12345", "keyword": "hello"}),
+    ("settings of owner", "settings", {"owner_id": "12345"}),
+    ("schedules of owner", "scheduled_messages", {"owner_id": "12345"}),
+    ("active schedules", "scheduled_messages", ACTIVE_SCHEDULE_FILTER),
+    ("cooldown upsert", "cooldowns", {"owner_id": "12345", "chat_id": 42}),
+    ("active cooldowns", "cooldowns", {"expires_at": {"$gt": datetime(2024, 1, 1)}}),
+]
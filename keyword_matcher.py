@@ -0,0 +1,245 @@
+"""
+Keyword auto-reply matcher - একটি account এর সব keyword rule একবারে compile
+করা হয়, তাই প্রতি message এ rule সংখ্যা যত বাড়ুক text একবারই scan হয়।
+
+Match types:
+    substring   - keyword text এর যেকোনো জায়গায় (default, পুরনো behaviour)
+    whole_word  - শুধু পুরো শব্দ হিসেবে ("hi" মিলবে না "this" এ)
+    prefix      - message keyword দিয়ে শুরু হলে
+    exact       - পুরো message keyword এর সমান হলে
+    regex       - Python regular expression
+"""
+
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+MATCH_TYPES = ("substring", "whole_word", "prefix", "exact", "regex")
+LITERAL_TYPES = ("substring", "whole_word", "prefix")
+
+def normalize_rule(rule: dict) -> dict:
+    """Fill in defaults and validate a keyword rule; raises ValueError"""
+    match_type = rule.get("match_type") or "substring"
+    if match_type not in MATCH_TYPES:
+        raise ValueError(f"Unknown match type '{match_type}'")
+
+    case_sensitive = bool(rule.get("case_sensitive", False))
+    keyword = (rule.get("keyword") or "").strip()
+    if not keyword:
+        raise ValueError("Keyword cannot be empty")
+    # Case-insensitive ও regex ছাড়া অন্য rule আগের মতো lowercase এ save হয়
+    if not case_sensitive and match_type != "regex":
+        keyword = keyword.lower()
+
+    if match_type == "regex":
+        try:
+            re.compile(keyword)
+        except re.error as e:
+            raise ValueError(f"Invalid regex '{keyword}': {e}")
+
+    rule = dict(rule)
+    rule.update({"keyword": keyword, "match_type": match_type, "case_sensitive": case_sensitive})
+    return rule
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+class _Automaton:
+    """Aho-Corasick automaton that yields every (start, keyword) occurrence"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._terminal: List[Optional[str]] = [None]
+        # _out[node] = nearest terminal node reachable through failure links
+        self._out: List[int] = [0]
+        self._links_dirty = False
+
+    def insert(self, pattern: str, keyword: str):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(None)
+                self._out.append(0)
+            node = nxt
+        self._terminal[node] = keyword
+        self._links_dirty = True
+
+    def _compile(self):
+        queue = list(self._goto[0].values())
+        for child in queue:
+            self._fail[child] = 0
+            self._out[child] = 0
+
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target
+                self._out[child] = target if self._terminal[target] else self._out[target]
+                queue.append(child)
+
+        self._links_dirty = False
+
+    def __bool__(self):
+        return len(self._goto) > 1
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, str]]:
+        if self._links_dirty:
+            self._compile()
+
+        goto = self._goto
+        fail = self._fail
+        terminal = self._terminal
+        out = self._out
+
+        node = 0
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if terminal[node] else out[node]
+            while hit:
+                keyword = terminal[hit]
+                yield pos - len(keyword) + 1, keyword
+                hit = out[hit]
+
+class KeywordMatcher:
+    """Compiled index over one account's keyword rules.
+
+    Literal rules (substring, whole_word, prefix) share two Aho-Corasick
+    automata (case-folded and case-sensitive) and exact rules are a hash
+    lookup, so a message costs one pass per index regardless of rule count.
+    Regex rules are precompiled and each searched on its own.
+
+    Priority is deterministic: an exact match wins, otherwise the longest
+    match, then the higher explicit ``priority`` field, then the earliest
+    position in the text. A regex rule competes with its leftmost match
+    (what ``re.search`` returns).
+    """
+
+    def __init__(self, rules: List[dict] = ()):
+        self._rules: Dict[str, dict] = {}
+        self._dirty = True
+        self._appendable = False
+        for rule in rules:
+            self.add(rule)
+
+    def __len__(self):
+        return len(self._rules)
+
+    def add(self, rule: dict):
+        """Add or replace a rule; literal rules are inserted in place when possible"""
+        try:
+            rule = normalize_rule(rule)
+        except ValueError:
+            return
+        keyword = rule["keyword"]
+        replaced = keyword in self._rules
+        self._rules[keyword] = rule
+
+        if self._appendable and not replaced and rule["match_type"] in LITERAL_TYPES:
+            self._insert_literal(rule)
+        else:
+            self._dirty = True
+
+    def remove(self, keyword: str):
+        if self._rules.pop(keyword, None) is not None:
+            # Trie থেকে node মুছে ফেলা জটিল, পরের match এ index আবার তৈরি হবে
+            self._dirty = True
+
+    def _insert_literal(self, rule: dict):
+        keyword = rule["keyword"]
+        if rule["case_sensitive"]:
+            self._exact_case.insert(keyword, keyword)
+        else:
+            self._folded.insert(keyword.lower(), keyword)
+
+    def _compile(self):
+        self._folded = _Automaton()
+        self._exact_case = _Automaton()
+        self._exact_folded: Dict[str, str] = {}
+        self._exact_sensitive: Dict[str, str] = {}
+        # Regex rule গুলো এক alternation এ জোড়া হয় না: alternation একই position
+        # এ প্রথম মেলা rule টিই দেয় (longest নয়) এবং overlapping match বাদ দেয়।
+        # CPython re তে alternation per-rule search এর চেয়ে দ্রুতও নয়।
+        self._regex_rules: List[Tuple[str, re.Pattern]] = []
+
+        for keyword, rule in self._rules.items():
+            match_type = rule["match_type"]
+            if match_type in LITERAL_TYPES:
+                self._insert_literal(rule)
+            elif match_type == "exact":
+                if rule["case_sensitive"]:
+                    self._exact_sensitive[keyword] = keyword
+                else:
+                    self._exact_folded[keyword.lower()] = keyword
+            else:
+                flags = 0 if rule["case_sensitive"] else re.IGNORECASE
+                self._regex_rules.append((keyword, re.compile(keyword, flags)))
+
+        self._dirty = False
+        self._appendable = True
+
+    def _rank(self, keyword: str, start: int, length: int) -> Tuple[int, int, int]:
+        return (length, int(self._rules[keyword].get("priority", 0) or 0), -start)
+
+    def _literal_ok(self, keyword: str, text: str, start: int) -> bool:
+        match_type = self._rules[keyword]["match_type"]
+        if match_type == "prefix":
+            return start == len(text) - len(text.lstrip())
+        if match_type == "whole_word":
+            end = start + len(keyword)
+            if start > 0 and _is_word_char(text[start - 1]):
+                return False
+            if end < len(text) and _is_word_char(text[end]):
+                return False
+        return True
+
+    def match(self, text: str) -> Optional[dict]:
+        """Return the winning rule for text, or None"""
+        if not self._rules or not text:
+            return None
+        if self._dirty:
+            self._compile()
+
+        stripped = text.strip()
+        if stripped in self._exact_sensitive:
+            return self._rules[self._exact_sensitive[stripped]]
+        folded = text.lower()
+        exact = self._exact_folded.get(stripped.lower())
+        if exact is not None:
+            return self._rules[exact]
+
+        best = None
+        best_key = None
+
+        def consider(keyword, start, length):
+            nonlocal best, best_key
+            key = self._rank(keyword, start, length)
+            if best_key is None or key > best_key:
+                best_key = key
+                best = keyword
+
+        for automaton, haystack in ((self._folded, folded), (self._exact_case, text)):
+            if not automaton:
+                continue
+            for start, keyword in automaton.find_all(haystack):
+                if keyword in self._rules and self._literal_ok(keyword, haystack, start):
+                    consider(keyword, start, len(keyword))
+
+        for keyword, pattern in self._regex_rules:
+            m = pattern.search(text)
+            if m:
+                consider(keyword, m.start(), m.end() - m.start())
+
+        return self._rules[best] if best is not None else None
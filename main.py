@@ -1,6 +1,10 @@
 import asyncio
+import hashlib
 import os
+import random
+import shutil
 import sys
+import tempfile
 
 # Force UTF-8 encoding for Windows console
 if sys.platform.startswith('win'):
@@ -13,19 +17,30 @@ if sys.platform.startswith('win'):
 from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, Header, Body, UploadFile, File, Form, Request, Response
 # from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
-from telethon import TelegramClient, events, types, custom
+from telethon import TelegramClient, events, types, custom, errors, utils
 from telethon.sessions import StringSession
+from telethon.tl import functions
 import logging
 from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from cache import DialogIndex, LRUCache, MessageWindow, TokenCache
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 import time
+from urllib.parse import quote
 
 # Import Database Module
 import database as db
+import sharding
+from media_cache import (
+    DiskLRUCache, MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES, PHOTO_CACHE_DIR, PHOTO_CACHE_MAX_BYTES,
+    iter_file, parse_range, read_bytes, write_bytes
+)
+import cooldown
+from scheduler import ScheduleQueue, TokenBucket, SEND_CONCURRENCY, SEND_MAX_RETRIES
 from contextlib import asynccontextmanager
 
 # Configure logging
@@ -39,23 +54,69 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # --- WebSocket Manager ---
+# প্রতিটি socket এর নিজস্ব bounded queue ও writer task, তাই ধীর tab অন্যদের আটকায় না
+WS_QUEUE_SIZE = int(os.environ.get("WS_QUEUE_SIZE", "100"))
+WS_SEND_TIMEOUT = float(os.environ.get("WS_SEND_TIMEOUT", "5"))
+WS_MAX_FAILURES = int(os.environ.get("WS_MAX_FAILURES", "3"))
+
+class _Subscriber:
+    __slots__ = ("websocket", "queue", "task", "failures", "dropped")
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+        self.task: Optional[asyncio.Task] = None
+        self.failures = 0
+        self.dropped = 0
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        # {api_id: [subscriber, ...]} - প্রতিটি account শুধু নিজের event পায়
+        self.active_connections: Dict[str, List[_Subscriber]] = {}
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, api_id: str):
         await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+        subscriber = _Subscriber(websocket)
+        subscriber.task = asyncio.create_task(self._writer(api_id, subscriber))
+        self.active_connections.setdefault(api_id, []).append(subscriber)
+
+    def disconnect(self, websocket: WebSocket, api_id: str):
+        connections = self.active_connections.get(api_id, [])
+        for subscriber in [s for s in connections if s.websocket is websocket]:
+            connections.remove(subscriber)
+            if subscriber.task and subscriber.task is not asyncio.current_task():
+                subscriber.task.cancel()
+        if not connections:
+            self.active_connections.pop(api_id, None)
+
+    async def _writer(self, api_id: str, subscriber: _Subscriber):
+        while True:
+            message = await subscriber.queue.get()
             try:
-                await connection.send_json(message)
+                await asyncio.wait_for(subscriber.websocket.send_json(message), WS_SEND_TIMEOUT)
+                subscriber.failures = 0
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"WebSocket broadcast error: {e}")
+                subscriber.failures += 1
+                logger.error(f"WebSocket send error for {api_id} ({subscriber.failures}/{WS_MAX_FAILURES}): {e}")
+                if subscriber.failures >= WS_MAX_FAILURES:
+                    logger.warning(f"Evicting unresponsive WebSocket for {api_id}")
+                    self.disconnect(subscriber.websocket, api_id)
+                    try:
+                        await subscriber.websocket.close()
+                    except Exception:
+                        pass
+                    return
+
+    async def send_to(self, api_id: str, message: dict):
+        """Queue message for the owner's sockets and return immediately"""
+        for subscriber in self.active_connections.get(api_id, []):
+            if subscriber.queue.full():
+                # সবচেয়ে পুরনো event বাদ দিয়ে নতুনটির জায়গা করুন
+                subscriber.queue.get_nowait()
+                subscriber.dropped += 1
+            subscriber.queue.put_nowait(message)
 
 manager = ConnectionManager()
 # security = HTTPBearer(auto_error=False)
@@ -64,6 +125,58 @@ manager = ConnectionManager()
 SECRET_KEY = "supersecretkey_change_this_in_production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+# একই cookie প্রতি request এ আসে, তাই verify করা token এর claims মনে রাখা হয়
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "10000"))
+
+# Startup এ একসাথে কয়টি bot connect হবে এবং FLOOD_WAIT এ কতবার retry
+STARTUP_CONCURRENCY = int(os.environ.get("STARTUP_CONCURRENCY", "8"))
+STARTUP_MAX_RETRIES = int(os.environ.get("STARTUP_MAX_RETRIES", "3"))
+
+# Idle hibernation - auto-reply duty নেই এমন idle account disconnect করা হয়
+# এবং দরকার হলে session_string থেকে আবার connect হয়। 0 = বন্ধ।
+HIBERNATE_IDLE_SECONDS = int(os.environ.get("HIBERNATE_IDLE_SECONDS", "0"))
+HIBERNATE_CHECK_INTERVAL = int(os.environ.get("HIBERNATE_CHECK_INTERVAL", "60"))
+MAX_ACTIVE_BOTS = int(os.environ.get("MAX_ACTIVE_BOTS", "0"))
+MAX_BOT_MEMORY_MB = int(os.environ.get("MAX_BOT_MEMORY_MB", "0"))
+# Disconnect এর সাথে সাথে RSS কমে না, তাই memory cap এ প্রতি check এ এতগুলো
+# LRU account hibernate হয় এবং পরের check এ আবার মাপা হয়
+HIBERNATE_MEMORY_STEP = int(os.environ.get("HIBERNATE_MEMORY_STEP", "1"))
+
+# Chat history window cache - প্রতি account এ কয়টি chat, প্রতি chat এ কয়টি message
+MESSAGE_WINDOW_CHATS = int(os.environ.get("MESSAGE_WINDOW_CHATS", "50"))
+MESSAGE_WINDOW_SIZE = int(os.environ.get("MESSAGE_WINDOW_SIZE", "500"))
+ENTITY_CACHE_SIZE = int(os.environ.get("ENTITY_CACHE_SIZE", "5000"))
+# Cold start এ কমপক্ষে কয়টি dialog load হবে
+DIALOG_INDEX_MIN = int(os.environ.get("DIALOG_INDEX_MIN", "100"))
+
+# Media proxy - Telegram থেকে chunk করে stream, offset এই size এ align হয়
+# (1MB এর ভাজক হতে হবে যাতে কোনো request 1MB boundary পার না হয়)
+MEDIA_REQUEST_SIZE = 128 * 1024
+MEDIA_REF_CACHE_SIZE = int(os.environ.get("MEDIA_REF_CACHE_SIZE", "1000"))
+
+# Upload - request body সরাসরি Telegram এ part হিসেবে যায়, memory তে থাকে
+# সর্বোচ্চ UPLOAD_PARALLEL_PARTS * UPLOAD_PART_SIZE byte
+UPLOAD_PART_SIZE = 512 * 1024
+UPLOAD_PARALLEL_PARTS = int(os.environ.get("UPLOAD_PARALLEL_PARTS", "4"))
+
+# Profile photo thumbnail - গরম photo HTTP serve করা process এর memory তে থাকে
+PHOTO_MEMORY_CACHE_SIZE = int(os.environ.get("PHOTO_MEMORY_CACHE_SIZE", "500"))
+PHOTO_PREFETCH_CONCURRENCY = int(os.environ.get("PHOTO_PREFETCH_CONCURRENCY", "4"))
+
+def _disk_store(directory: str, max_bytes: int) -> Optional[DiskLRUCache]:
+    """Sharding এ প্রতিটি worker নিজের subdirectory ও budget এর ভাগ পায়, front কোনো disk cache রাখে না"""
+    if sharding.is_front():
+        return None
+    if sharding.is_worker():
+        return DiskLRUCache(
+            os.path.join(directory, f"shard-{sharding.SHARD_INDEX}"),
+            max_bytes // sharding.SHARD_COUNT
+        )
+    return DiskLRUCache(directory, max_bytes)
+
+media_store = _disk_store(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES)
+photo_store = _disk_store(PHOTO_CACHE_DIR, PHOTO_CACHE_MAX_BYTES)
+photo_memory = LRUCache(PHOTO_MEMORY_CACHE_SIZE)
 
 # --- Pydantic Models ---
 class LoginRequest(BaseModel):
@@ -86,6 +199,12 @@ class SettingsRequest(BaseModel):
 class KeywordRequest(BaseModel):
     keyword: str
     reply: str
+    match_type: str = "substring"  # substring | whole_word | prefix | exact | regex
+    case_sensitive: bool = False
+    priority: int = 0
+
+class PhotoPrefetchRequest(BaseModel):
+    peer_ids: Optional[List[int]] = None
 
 class ChatMessageRequest(BaseModel):
     chat_id: int
@@ -118,26 +237,84 @@ class ScheduledMessageRequest(BaseModel):
     active: bool = True
     usernames: Optional[List[str]] = []
 
+class _BodyReader:
+    """File-like read(n) over an async chunk iterator (request body / UploadFile)"""
+
+    def __init__(self, chunks):
+        self._chunks = chunks.__aiter__()
+        self._buffer = bytearray()
+        self._eof = False
+
+    async def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                self._buffer += await self._chunks.__anext__()
+            except StopAsyncIteration:
+                self._eof = True
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+async def _iter_upload(file: UploadFile):
+    while True:
+        chunk = await file.read(UPLOAD_PART_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
 # --- BotManager ---
 class BotManager:
     def __init__(self):
         self.active_bots: Dict[str, TelegramClient] = {}
         self.pending_clients: Dict[str, TelegramClient] = {}
-        self.last_reply_times: Dict[str, Dict[int, float]] = {}  # {api_id: {chat_id: timestamp}}
+        # Auto-reply cooldown, Mongo তে write-behind হয় তাই restart এর পরেও থাকে
+        self.cooldowns = cooldown.create_store(sharding.owns)
         self.locks: Dict[str, asyncio.Lock] = {}
         self.message_handlers = {}
+        self.last_used: "OrderedDict[str, float]" = OrderedDict()  # LRU order, oldest first
+        self.hibernated = set()
+        self.schedule_queue = ScheduleQueue()
+        self.send_buckets: Dict[str, TokenBucket] = {}
+        self.delivery_tasks = set()
+        self.message_windows: Dict[str, "OrderedDict[int, MessageWindow]"] = {}
+        self.entity_caches: Dict[str, LRUCache] = {}
+        self.dialog_indexes: Dict[str, DialogIndex] = {}
+        # (api_id, chat_id, message_id) -> (message, media info), Range request এ বারবার get_messages এড়াতে
+        self.media_refs = LRUCache(MEDIA_REF_CACHE_SIZE)
+        # "peer_id:photo_id" -> চলমান thumbnail download, একই photo দুবার নামানো এড়াতে
+        self.photo_downloads: Dict[str, asyncio.Task] = {}
+        self.prefetch_tasks = set()
+        # Preview message delete হলে chat এর নতুন শেষ message আনার task
+        self.preview_tasks = set()
+        self.startup_progress = {
+            "state": "idle",
+            "total": 0,
+            "started": 0,
+            "failed": 0,
+            "skipped": 0,
+            "started_at": None,
+            "finished_at": None
+        }
 
     def _get_lock(self, api_id: str) -> asyncio.Lock:
         if api_id not in self.locks:
             self.locks[api_id] = asyncio.Lock()
         return self.locks[api_id]
 
-    async def get_client(self, api_id: str, api_hash: str = None) -> TelegramClient:
+    def _touch(self, api_id: str):
+        self.last_used[api_id] = time.time()
+        self.last_used.move_to_end(api_id)
+        self.hibernated.discard(api_id)
+
+    async def get_client(self, api_id: str, api_hash: str = None, session_string: str = None) -> TelegramClient:
         async with self._get_lock(api_id):
             # Return if already active
             if api_id in self.active_bots:
                 client = self.active_bots[api_id]
                 if client.is_connected():
+                    self._touch(api_id)
                     return client
             
             # Get API hash if not provided
@@ -146,12 +323,13 @@ class BotManager:
                 if not api_hash:
                     raise ValueError(f"API Hash not found for {api_id}. Please login again.")
             
-            # Get session from database
-            user_data = await db.get_user_session(api_id)
-            session_string = None
+            # Get session from database (startup এ boot record থেকেই আসে)
+            if not session_string:
+                user_data = await db.get_user_session(api_id)
+                if user_data and user_data.get("session_string"):
+                    session_string = user_data.get("session_string")
             
-            if user_data and user_data.get("session_string"):
-                session_string = user_data.get("session_string")
+            if session_string:
                 logger.info(f"Found session string for {api_id}")
             else:
                 logger.warning(f"No session string found for {api_id}")
@@ -180,13 +358,14 @@ class BotManager:
                 # Start the client
                 await client.start()
                 
-                # Attach handlers if not already attached
-                if api_id not in self.message_handlers:
+                # Attach handlers to every new client object
+                if not getattr(client, "_handlers_attached", False):
                     self._attach_handlers(client, api_id)
                     self.message_handlers[api_id] = True
                 
                 # Store and return
                 self.active_bots[api_id] = client
+                self._touch(api_id)
                 logger.info(f"[SUCCESS] Bot started successfully for {api_id}")
                 
                 # Get user info and update DB
@@ -324,17 +503,20 @@ class BotManager:
             
             # Store in active bots
             self.active_bots[api_id] = client
+            self._touch(api_id)
             
             # Save session to database
             me = await client.get_me()
             session_str = client.session.save()
             
+            # নতুন login এর session সাথে সাথে লেখা হয়, buffer এ রাখা হয় না
             await db.register_user_login(
                 api_id, 
                 api_hash, 
                 me.first_name, 
                 me.username, 
-                session_string=session_str
+                session_string=session_str,
+                flush=True
             )
             
             logger.info(f"[SUCCESS] Client setup completed for {api_id} - {me.first_name}")
@@ -347,80 +529,313 @@ class BotManager:
         """Start bot with existing session"""
         return await self.get_client(api_id, api_hash)
 
-    async def get_dialogs(self, api_id: str, limit: int = 50):
+    async def get_dialogs(self, api_id: str, limit: int = 50, offset: int = 0, refresh: bool = False):
+        """Dialog page from the in-memory index; Telegram is only asked on a cold
+        start, an explicit refresh or a page beyond what has been loaded"""
         client = await self.get_client(api_id)
-        dialogs = []
+        index = self.dialog_indexes.get(api_id)
+        needed = offset + limit
         
+        if refresh or index is None or (len(index) < needed and not index.complete):
+            fetch_limit = max(needed, DIALOG_INDEX_MIN)
+            dialogs = []
+            preview_ids = {}
+            try:
+                async for dialog in client.iter_dialogs(limit=fetch_limit):
+                    dialogs.append({
+                        "id": dialog.id,
+                        "name": dialog.name or "Unknown",
+                        "message": dialog.message.text if dialog.message else "",
+                        "date": dialog.date.isoformat() if dialog.date else ""
+                    })
+                    if dialog.message:
+                        preview_ids[dialog.id] = dialog.message.id
+                    if dialog.entity is not None:
+                        self._entity_cache(api_id).set(dialog.entity.id, dialog.entity)
+            except Exception as e:
+                logger.error(f"Error getting dialogs for {api_id}: {e}")
+                return index.page(offset, limit) if index else []
+            
+            index = DialogIndex(dialogs, complete=len(dialogs) < fetch_limit, preview_ids=preview_ids)
+            self.dialog_indexes[api_id] = index
+        
+        return index.page(offset, limit)
+
+    def _update_dialog(self, api_id: str, chat_id: int, message, chat=None):
+        """Apply a new message to the dialog index (preview text and ordering)"""
+        index = self.dialog_indexes.get(api_id)
+        if index is None or message is None:
+            return
+        name = utils.get_display_name(chat) if chat is not None else None
+        index.touch(chat_id, message.text or "", message.date.isoformat(), name, message.id)
+
+    def _remove_dialog_preview(self, api_id: str, chat_id: int, message_ids):
+        """Drop a deleted preview and show the chat's newest remaining message instead"""
+        index = self.dialog_indexes.get(api_id)
+        if index is None or not index.remove(chat_id, message_ids):
+            return
+        window = self.message_windows.get(api_id, {}).get(chat_id)
+        if window is not None and window.at_head:
+            # Window এ newest message আছে, Telegram কে জিজ্ঞেস করার দরকার নেই
+            latest = window.latest(1)
+            if latest:
+                index.set_preview(chat_id, latest[0]["text"], latest[0]["date"], latest[0]["id"])
+            return
+        task = asyncio.create_task(self._refresh_dialog_preview(api_id, chat_id))
+        self.preview_tasks.add(task)
+        task.add_done_callback(self.preview_tasks.discard)
+
+    async def _refresh_dialog_preview(self, api_id: str, chat_id: int):
+        client = self.active_bots.get(api_id)
+        index = self.dialog_indexes.get(api_id)
+        if client is None or index is None:
+            return
         try:
-            async for dialog in client.iter_dialogs(limit=limit):
-                dialogs.append({
-                    "id": dialog.id,
-                    "name": dialog.name or "Unknown",
-                    "message": dialog.message.text if dialog.message else "",
-                    "date": dialog.date.isoformat() if dialog.date else ""
-                })
+            messages = await client.get_messages(chat_id, limit=1)
         except Exception as e:
-            logger.error(f"Error getting dialogs for {api_id}: {e}")
+            logger.error(f"Error refreshing dialog preview of {chat_id} for {api_id}: {e}")
+            return
+        if messages:
+            index.set_preview(chat_id, messages[0].text or "", messages[0].date.isoformat(), messages[0].id)
+
+    def _get_window(self, api_id: str, chat_id: int) -> MessageWindow:
+        windows = self.message_windows.setdefault(api_id, OrderedDict())
+        window = windows.get(chat_id)
+        if window is None:
+            window = windows[chat_id] = MessageWindow(MESSAGE_WINDOW_SIZE)
+            if len(windows) > MESSAGE_WINDOW_CHATS:
+                windows.popitem(last=False)
+        windows.move_to_end(chat_id)
+        return window
+
+    def _entity_cache(self, api_id: str) -> LRUCache:
+        if api_id not in self.entity_caches:
+            self.entity_caches[api_id] = LRUCache(ENTITY_CACHE_SIZE)
+        return self.entity_caches[api_id]
+
+    def _resolve_sender(self, api_id: str, message):
+        """Sender from the entities Telethon already received, else from the entity cache"""
+        entities = self._entity_cache(api_id)
+        for entity in (message.sender, message.chat):
+            if entity is not None:
+                entities.set(entity.id, entity)
+        if message.sender is not None:
+            return message.sender
+        if message.sender_id is None:
+            return None
+        # Channel sender id marked (-100...) থাকে, entity.id থাকে bare
+        return entities.get(utils.resolve_id(message.sender_id)[0])
+
+    async def _get_event_sender(self, api_id: str, event):
+        """Like event.get_sender() but only hits Telegram on an entity cache miss"""
+        sender = self._resolve_sender(api_id, event.message)
+        if sender is None and event.message.sender_id is not None:
+            sender = await event.get_sender()
+            if sender is not None:
+                self._entity_cache(api_id).set(sender.id, sender)
+        return sender
+
+    def _remember_sent(self, api_id: str, chat_id: int, message):
+        """Add a message sent by this client to the chat's window, if cached"""
+        self._update_dialog(api_id, chat_id, message)
+        windows = self.message_windows.get(api_id, {})
+        if message is not None and chat_id in windows:
+            windows[chat_id].add_newest(self._serialize_message(message, None))
+
+    @staticmethod
+    def _serialize_message(message, sender) -> dict:
+        sender_name = "Unknown"
+        if sender:
+            sender_name = getattr(sender, 'first_name', '') or getattr(sender, 'title', 'Unknown')
+        
+        media_info = None
+        if message.media:
+            if hasattr(message.media, 'photo'):
+                media_info = {"type": "photo"}
+            elif hasattr(message.media, 'document'):
+                mime_type = message.media.document.mime_type
+                filename = None
+                for attr in message.media.document.attributes:
+                    if hasattr(attr, 'file_name'):
+                        filename = attr.file_name
+                        break
+                media_info = {"type": "document", "mime_type": mime_type, "filename": filename}
         
-        return dialogs
+        return {
+            "id": message.id,
+            "sender_id": message.sender_id,
+            "sender_name": sender_name,
+            "text": message.text or "",
+            "date": message.date.isoformat(),
+            "outgoing": message.out,
+            "media": media_info
+        }
 
-    async def get_messages(self, api_id: str, chat_id: int, limit: int = 50):
-        client = await self.get_client(api_id)
+    async def _fetch_history(self, api_id: str, client, chat_id: int, limit: int, offset_id: int = 0,
+                             min_id: int = 0, reverse: bool = False) -> list:
+        """Fetch one page from Telegram, returned oldest first"""
         messages = []
+        # একটি history request; sender গুলো response এর entity থেকে, আলাদা request নয়
+        async for message in client.iter_messages(chat_id, limit=limit, offset_id=offset_id,
+                                                  min_id=min_id, reverse=reverse):
+            sender = self._resolve_sender(api_id, message)
+            messages.append(self._serialize_message(message, sender))
+        
+        if not reverse:
+            # Reverse to show newest at bottom
+            messages.reverse()
+        return messages
+
+    async def get_messages(self, api_id: str, chat_id: int, limit: int = 50,
+                           before: Optional[int] = None, after: Optional[int] = None):
+        """Chat history page, oldest first.
+
+        before: messages older than this id (scroll back)
+        after:  messages newer than this id
+        Pages inside the cached window are served locally; only missing
+        ranges are fetched from Telegram.
+        """
+        client = await self.get_client(api_id)
+        window = self._get_window(api_id, chat_id)
         
         try:
-            async for message in client.iter_messages(chat_id, limit=limit):
-                sender = await message.get_sender()
-                sender_name = "Unknown"
-                if sender:
-                    sender_name = getattr(sender, 'first_name', '') or getattr(sender, 'title', 'Unknown')
-                
-                media_info = None
-                if message.media:
-                    if hasattr(message.media, 'photo'):
-                        media_info = {"type": "photo"}
-                    elif hasattr(message.media, 'document'):
-                        mime_type = message.media.document.mime_type
-                        filename = None
-                        for attr in message.media.document.attributes:
-                            if hasattr(attr, 'file_name'):
-                                filename = attr.file_name
-                                break
-                        media_info = {"type": "document", "mime_type": mime_type, "filename": filename}
-                
-                messages.append({
-                    "id": message.id,
-                    "sender_id": message.sender_id,
-                    "sender_name": sender_name,
-                    "text": message.text or "",
-                    "date": message.date.isoformat(),
-                    "outgoing": message.out,
-                    "media": media_info
-                })
+            if after is not None:
+                if window.at_head and window.ids and window.ids[0] <= after:
+                    return window.newer_than(after, limit)
+                return await self._fetch_history(api_id, client, chat_id, limit, min_id=after, reverse=True)
+            
+            if before is None:
+                if window.at_head and (len(window) >= limit or window.at_tail):
+                    return window.latest(limit)
+                batch = await self._fetch_history(api_id, client, chat_id, limit)
+                window.replace(batch, at_head=True, at_tail=len(batch) < limit)
+                return window.latest(limit)
+            
+            if window.ids and window.ids[0] <= before and (window.at_head or before <= window.ids[-1] + 1):
+                page = window.older_than(before, limit)
+                missing = limit - len(page)
+                if missing > 0 and not window.at_tail:
+                    batch = await self._fetch_history(api_id, client, chat_id, missing, offset_id=window.ids[0])
+                    window.extend_older(batch, at_tail=len(batch) < missing)
+                    page = window.older_than(before, limit)
+                return page
+            
+            # Window এর বাইরের range - cache না করে সরাসরি আনুন
+            return await self._fetch_history(api_id, client, chat_id, limit, offset_id=before)
         except Exception as e:
             logger.error(f"Error getting messages for {api_id}: {e}")
-        
-        # Reverse to show newest at bottom
-        messages.reverse()
-        return messages
+            return []
 
-    async def download_media(self, api_id: str, chat_id: int, message_id: int):
-        """Media download is disabled for local storage safety.
-        In a production environment, this should stream directly to the client or use cloud storage."""
-        logger.warning(f"Media download requested but local storage is disabled. (Bot: {api_id}, Chat: {chat_id})")
-        return None
+    async def get_media_info(self, api_id: str, chat_id: int, message_id: int) -> Optional[dict]:
+        """Cache key, size and type of a message's photo/document, or None"""
+        ref = self.media_refs.get((api_id, chat_id, message_id))
+        if ref is not None:
+            return ref[1]
 
-    async def send_message(self, api_id: str, chat_id: int, text: str, file_path: Optional[str] = None):
+        client = await self.get_client(api_id)
+        message = await client.get_messages(chat_id, ids=message_id)
+        media = (message.photo or message.document) if message else None
+        if media is None:
+            return None
+
+        if message.photo:
+            # iter_download photo এর শেষ size টি নামায়
+            size = utils._photo_size_byte_count(media.sizes[-1]) or None
+            mime_type = "image/jpeg"
+        else:
+            size = media.size
+            mime_type = media.mime_type or "application/octet-stream"
+        info = {
+            # Telegram media id content এর সাথে বাঁধা, তাই বিভিন্ন chat/account এ একই file একবারই cache হয়
+            "key": f"{'photo' if message.photo else 'document'}:{media.id}",
+            "size": size,
+            "mime_type": mime_type,
+            "filename": message.file.name if message.file else None
+        }
+        self.media_refs.set((api_id, chat_id, message_id), (message, info))
+        return info
+
+    async def stream_media(self, api_id: str, chat_id: int, message_id: int, offset: int = 0, length: Optional[int] = None):
+        """Yield media bytes [offset, offset + length) straight from Telegram.
+
+        A full-file stream is also written to the disk cache.
+        """
+        info = await self.get_media_info(api_id, chat_id, message_id)
+        if info is None:
+            return
+        message, _ = self.media_refs.get((api_id, chat_id, message_id))
+        client = await self.get_client(api_id)
+        self._touch(api_id)
+
+        aligned = offset - offset % MEDIA_REQUEST_SIZE
+        skip = offset - aligned
+        remaining = length
+
+        temp_path = None
+        if offset == 0 and (length is None or length == info["size"]):
+            temp_path = media_store.temp_path(info["key"])
+        temp_file = open(temp_path, "wb") if temp_path else None
+        complete = False
+        try:
+            download = client.iter_download(
+                message.photo or message.document,
+                offset=aligned,
+                request_size=MEDIA_REQUEST_SIZE,
+                file_size=info["size"]
+            )
+            async with download:
+                async for chunk in download:
+                    if skip:
+                        chunk, skip = chunk[skip:], 0
+                    if remaining is not None:
+                        chunk = chunk[:remaining]
+                        remaining -= len(chunk)
+                    if chunk:
+                        if temp_file:
+                            await asyncio.to_thread(temp_file.write, chunk)
+                        yield chunk
+                    if remaining == 0:
+                        break
+            complete = remaining in (None, 0)
+        finally:
+            if temp_file:
+                temp_file.close()
+                if complete:
+                    media_store.commit(info["key"], temp_path)
+                else:
+                    # Client মাঝপথে চলে গেলে অসম্পূর্ণ file রাখা হয় না
+                    try:
+                        os.remove(temp_path)
+                    except OSError:
+                        pass
+
+    async def download_media(self, api_id: str, chat_id: int, message_id: int) -> Optional[dict]:
+        """Make sure the media is in the disk cache; returns its info with a local "path" """
+        info = await self.get_media_info(api_id, chat_id, message_id)
+        if info is None:
+            return None
+        path = media_store.get(info["key"])
+        if path is None:
+            async for _ in self.stream_media(api_id, chat_id, message_id):
+                pass
+            path = media_store.get(info["key"])
+        return {**info, "path": path} if path else None
+
+    async def send_message(self, api_id: str, chat_id: int, text: str, file_path: Optional[str] = None, input_file=None):
         client = await self.get_client(api_id)
         
         try:
-            if file_path and os.path.exists(file_path):
-                await client.send_file(chat_id, file_path, caption=text)
+            if input_file is not None:
+                sent = await client.send_file(chat_id, input_file, caption=text)
+            elif file_path and os.path.exists(file_path):
+                sent = await client.send_file(chat_id, file_path, caption=text)
             else:
-                await client.send_message(chat_id, text)
+                sent = await client.send_message(chat_id, text)
+            
+            self._remember_sent(api_id, chat_id, sent)
             
-            # Broadcast to WebSocket
-            await manager.broadcast({
+            # Notify the owner's WebSocket tabs
+            await manager.send_to(api_id, {
                 "type": "message_sent",
                 "chat_id": chat_id,
                 "text": text,
@@ -432,8 +847,137 @@ class BotManager:
             logger.error(f"Error sending message: {e}")
             raise
 
+    async def _upload_stream(self, client, stream, file_size: int, file_name: str, progress_callback=None):
+        """Upload stream to Telegram with up to UPLOAD_PARALLEL_PARTS parts in flight.
+
+        Same protocol as client.upload_file, but parts are read sequentially and
+        saved concurrently so a slow round trip does not stall the request body.
+        """
+        part_count = (file_size + UPLOAD_PART_SIZE - 1) // UPLOAD_PART_SIZE
+        # 10MB এর বড় file এর জন্য Telegram আলাদা "big file" request চায়
+        is_big = file_size > 10 * 1024 * 1024
+        file_id = random.getrandbits(63)
+        md5 = hashlib.md5()
+        uploaded = 0
+
+        async def save_part(index: int, part: bytes):
+            nonlocal uploaded
+            if is_big:
+                request = functions.upload.SaveBigFilePartRequest(file_id, index, part_count, part)
+            else:
+                request = functions.upload.SaveFilePartRequest(file_id, index, part)
+            if not await client(request):
+                raise RuntimeError(f"Failed to upload file part {index}")
+            uploaded += len(part)
+            if progress_callback:
+                await progress_callback(uploaded, file_size)
+
+        in_flight = set()
+        received = 0
+        try:
+            for index in range(part_count):
+                part = await stream.read(UPLOAD_PART_SIZE)
+                if not part or (len(part) != UPLOAD_PART_SIZE and index < part_count - 1):
+                    raise ValueError("Upload ended before the declared file size")
+                received += len(part)
+                if not is_big:
+                    md5.update(part)
+                in_flight.add(asyncio.create_task(save_part(index, part)))
+                if len(in_flight) >= UPLOAD_PARALLEL_PARTS:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+            # শেষ part ছোট হতে পারে, তাই মোট byte ও stream শেষ হয়েছে কিনা দুটোই দেখা হয়
+            if received != file_size:
+                raise ValueError(f"Upload size mismatch: received {received} bytes, declared {file_size}")
+            if await stream.read(1):
+                raise ValueError("Upload is larger than the declared file size")
+            await asyncio.gather(*in_flight)
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            raise
+
+        if is_big:
+            return types.InputFileBig(file_id, part_count, file_name)
+        return custom.InputSizedFile(file_id, part_count, file_name, md5=md5, size=file_size)
+
+    async def send_media_stream(self, api_id: str, chat_id: int, text: str, stream, file_size: int,
+                                file_name: str, upload_id: Optional[str] = None):
+        """Pipe an upload stream into Telegram and send it, reporting progress over WebSocket"""
+        client = await self.get_client(api_id)
+        self._touch(api_id)
+        last_percent = -1
+
+        async def report(sent: int, total: int):
+            nonlocal last_percent
+            percent = sent * 100 // total
+            if percent == last_percent:
+                return
+            last_percent = percent
+            await manager.send_to(api_id, {
+                "type": "upload_progress",
+                "upload_id": upload_id,
+                "chat_id": chat_id,
+                "filename": file_name,
+                "sent": sent,
+                "total": total
+            })
+
+        input_file = await self._upload_stream(client, stream, file_size, file_name, report)
+        return await self.send_message(api_id, chat_id, text, input_file=input_file)
+
     def _attach_handlers(self, client, api_id):
         """Attach event handlers to client"""
+        # নতুন connection এর আগে মিস হওয়া event এর জন্য পুরনো window ও dialog index বাদ
+        self.message_windows.pop(api_id, None)
+        self.dialog_indexes.pop(api_id, None)
+        
+        @client.on(events.NewMessage(outgoing=True))
+        async def handle_outgoing_message(event):
+            # অন্য device থেকে পাঠানো message - শুধু cache update
+            self._update_dialog(api_id, event.chat_id, event.message, event.chat)
+            windows = self.message_windows.get(api_id, {})
+            if event.chat_id in windows:
+                windows[event.chat_id].add_newest(self._serialize_message(event.message, None))
+        
+        @client.on(events.MessageEdited())
+        async def handle_edited_message(event):
+            index = self.dialog_indexes.get(api_id)
+            if index is not None:
+                index.edit(event.chat_id, event.message.id, event.message.text or "")
+            windows = self.message_windows.get(api_id, {})
+            if event.chat_id in windows:
+                sender = await self._get_event_sender(api_id, event)
+                windows[event.chat_id].update(self._serialize_message(event.message, sender))
+        
+        @client.on(events.MessageDeleted())
+        async def handle_deleted_message(event):
+            windows = self.message_windows.get(api_id, {})
+            if event.chat_id is not None:
+                # Channel/supergroup এর message id শুধু সেই channel এর মধ্যে unique
+                if event.chat_id in windows:
+                    windows[event.chat_id].remove(event.deleted_ids)
+                self._remove_dialog_preview(api_id, event.chat_id, event.deleted_ids)
+                return
+            # Private chat ও ছোট group এ chat_id আসে না, কিন্তু তারা একটি id sequence
+            # share করে - তাই শুধু non-channel window গুলো থেকে বাদ
+            for chat_id, window in windows.items():
+                if utils.resolve_id(chat_id)[1] is not types.PeerChannel:
+                    window.remove(event.deleted_ids)
+            index = self.dialog_indexes.get(api_id)
+            if index is not None:
+                for chat_id, preview_id in list(index.preview_ids.items()):
+                    if preview_id in event.deleted_ids and utils.resolve_id(chat_id)[1] is not types.PeerChannel:
+                        self._remove_dialog_preview(api_id, chat_id, event.deleted_ids)
+
+        @client.on(events.ChatAction())
+        async def handle_chat_action(event):
+            # Group/channel এর নাম বদলালে dialog list এও নতুন নাম
+            if event.new_title:
+                index = self.dialog_indexes.get(api_id)
+                if index is not None:
+                    index.rename(event.chat_id, event.new_title)
         
         @client.on(events.NewMessage(incoming=True))
         async def handle_new_message(event):
@@ -444,6 +988,14 @@ class BotManager:
                 
                 logger.info(f"[MSG] New message from {sender_id}: '{text[:50]}...' (Bot: {api_id})")
                 
+                # History cache সব incoming message এ update হয়, reply হোক বা না হোক।
+                # Reply এর আগে কোনো network call নয়: sender শুধু event/entity cache থেকে
+                sender = self._resolve_sender(api_id, event.message)
+                self._update_dialog(api_id, sender_id, event.message, event.chat)
+                windows = self.message_windows.get(api_id, {})
+                if sender_id in windows:
+                    windows[sender_id].add_newest(self._serialize_message(event.message, sender))
+                
                 # Get settings
                 settings = await db.get_settings(api_id)
                 
@@ -452,39 +1004,41 @@ class BotManager:
                     return
                 
                 # 1. Check keywords first
-                keywords = await db.get_keywords(api_id)
-                for keyword_data in keywords:
-                    keyword = keyword_data.get("keyword", "").lower()
-                    if keyword and keyword in text.lower():
-                        reply_text = keyword_data.get("reply", "")
-                        if reply_text:
-                            await event.reply(reply_text)
-                            logger.info(f"[SUCCESS] Keyword reply sent for '{keyword}' to {sender_id}")
-                            return
+                matcher = await db.get_keyword_matcher(api_id)
+                keyword_data = matcher.match(text)
+                if keyword_data:
+                    reply_text = keyword_data.get("reply", "")
+                    if reply_text:
+                        self._remember_sent(api_id, sender_id, await event.reply(reply_text))
+                        logger.info(f"[SUCCESS] Keyword reply sent for '{keyword_data.get('keyword')}' to {sender_id}")
+                        return
                 
                 # 2. Auto-reply with cooldown
                 auto_reply_text = settings.get("auto_reply_text", "")
                 wait_time = settings.get("wait_time", 3600)  # Default 1 hour
                 
-                # Initialize cooldown tracker
-                if api_id not in self.last_reply_times:
-                    self.last_reply_times[api_id] = {}
-                
-                last_reply = self.last_reply_times[api_id].get(sender_id, 0)
+                last_reply = self.cooldowns.last_reply(api_id, sender_id)
                 time_since_last = current_time - last_reply
                 
                 if time_since_last > wait_time and auto_reply_text:
-                    await event.reply(auto_reply_text)
-                    self.last_reply_times[api_id][sender_id] = current_time
+                    self._remember_sent(api_id, sender_id, await event.reply(auto_reply_text))
+                    self.cooldowns.record(api_id, sender_id, current_time, wait_time)
                     logger.info(f"[SUCCESS] Auto-reply sent to {sender_id}")
                 elif auto_reply_text:
                     logger.info(f"[COOLDOWN] Cooldown active for {sender_id} ({int(wait_time - time_since_last)}s remaining)")
                 
-                # 3. Broadcast to WebSocket
-                sender = await event.get_sender()
+                # 3. Notify the owner's WebSocket tabs
+                if sender is None:
+                    # Entity cache miss - reply চলে যাওয়ার পরে Telegram থেকে, ব্যর্থ হলেও notify হয়
+                    try:
+                        sender = await self._get_event_sender(api_id, event)
+                    except Exception as e:
+                        logger.warning(f"Could not resolve sender of {sender_id} for {api_id}: {e}")
+                    if sender is not None and sender_id in windows:
+                        windows[sender_id].update(self._serialize_message(event.message, sender))
                 sender_name = getattr(sender, 'first_name', '') or getattr(sender, 'title', 'Unknown')
                 
-                await manager.broadcast({
+                await manager.send_to(api_id, {
                     "type": "new_message",
                     "chat_id": sender_id,
                     "chat_name": sender_name,
@@ -500,90 +1054,382 @@ class BotManager:
         client._handlers_attached = True
         logger.info(f"[SUCCESS] Handlers attached for bot {api_id}")
 
-    async def get_profile_photo(self, api_id: str, peer_id: int):
-        """Profile photo caching is disabled to avoid local storage usage."""
-        return None
+    async def _peer_photo_id(self, api_id: str, peer_id: int) -> Optional[int]:
+        """Current profile photo id of a peer, from the entity cache when possible"""
+        entities = self._entity_cache(api_id)
+        entity = entities.get(utils.resolve_id(peer_id)[0])
+        if entity is None:
+            client = await self.get_client(api_id)
+            entity = await client.get_entity(peer_id)
+            entities.set(entity.id, entity)
+        return getattr(getattr(entity, "photo", None), "photo_id", None)
+
+    async def get_profile_photo(self, api_id: str, peer_id: int) -> Optional[str]:
+        """Versioned thumbnail URL for the peer's current photo, or None"""
+        try:
+            photo_id = await self._peer_photo_id(api_id, peer_id)
+        except Exception as e:
+            logger.error(f"Error resolving photo of {peer_id} for {api_id}: {e}")
+            return None
+        return self._photo_url(peer_id, photo_id)
+
+    async def can_view_photo(self, api_id: str, peer_id: int, photo_id: int) -> bool:
+        """True if photo_id is the current photo of a peer this account can see"""
+        try:
+            return await self._peer_photo_id(api_id, peer_id) == photo_id
+        except Exception:
+            return False
+
+    @staticmethod
+    def _photo_url(peer_id: int, photo_id: Optional[int]) -> Optional[str]:
+        return f"/api/photos/{peer_id}/{photo_id}" if photo_id else None
+
+    async def get_photo_path(self, api_id: str, peer_id: int, photo_id: int) -> Optional[str]:
+        """Disk path of the small profile photo, downloading it once per (peer_id, photo_id)"""
+        key = f"{peer_id}:{photo_id}"
+        path = photo_store.get(key)
+        if path is not None:
+            return path
+
+        task = self.photo_downloads.get(key)
+        if task is None:
+            task = asyncio.create_task(self._download_photo(api_id, peer_id, photo_id, key))
+            self.photo_downloads[key] = task
+            task.add_done_callback(lambda _: self.photo_downloads.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _download_photo(self, api_id: str, peer_id: int, photo_id: int, key: str) -> Optional[str]:
+        try:
+            if await self._peer_photo_id(api_id, peer_id) != photo_id:
+                # Photo বদলে গেছে - নতুন URL টি get_profile_photo থেকে আসবে
+                return None
+            client = await self.get_client(api_id)
+            entity = self._entity_cache(api_id).get(utils.resolve_id(peer_id)[0]) or peer_id
+            data = await client.download_profile_photo(entity, file=bytes, download_big=False)
+        except Exception as e:
+            logger.error(f"Error downloading photo of {peer_id} for {api_id}: {e}")
+            return None
+        if not data:
+            return None
+        temp_path = photo_store.temp_path(key)
+        write_bytes(temp_path, data)
+        return photo_store.commit(key, temp_path)
+
+    async def prefetch_photos(self, api_id: str, peer_ids: Optional[List[int]] = None) -> Dict[str, Optional[str]]:
+        """Thumbnail URLs for many peers (default: every loaded dialog).
+
+        Missing thumbnails are downloaded in the background, so the browser's
+        image requests usually find them already on disk.
+        """
+        if peer_ids is None:
+            index = self.dialog_indexes.get(api_id)
+            dialogs = index.page(0, len(index)) if index else await self.get_dialogs(api_id)
+            peer_ids = [dialog["id"] for dialog in dialogs]
+
+        urls = {}
+        pending = []
+        for peer_id in peer_ids:
+            try:
+                photo_id = await self._peer_photo_id(api_id, peer_id)
+            except Exception as e:
+                logger.error(f"Error resolving photo of {peer_id} for {api_id}: {e}")
+                photo_id = None
+            urls[str(peer_id)] = self._photo_url(peer_id, photo_id)
+            if photo_id and photo_store.get(f"{peer_id}:{photo_id}") is None:
+                pending.append((peer_id, photo_id))
+
+        if pending:
+            semaphore = asyncio.Semaphore(PHOTO_PREFETCH_CONCURRENCY)
+
+            async def fetch(peer_id: int, photo_id: int):
+                async with semaphore:
+                    await self.get_photo_path(api_id, peer_id, photo_id)
+
+            async def fetch_all():
+                await asyncio.gather(*(fetch(*item) for item in pending))
+
+            task = asyncio.create_task(fetch_all())
+            self.prefetch_tasks.add(task)
+            task.add_done_callback(self.prefetch_tasks.discard)
+        return urls
+
+    async def _boot_session(self, record: dict, semaphore: asyncio.Semaphore):
+        """Start one saved session, retrying with jittered backoff on FLOOD_WAIT"""
+        progress = self.startup_progress
+        user = record["user"]
+        api_id = user["api_id"]
+        api_hash = record["credentials"].get("api_hash")
+        if not api_hash:
+            logger.warning(f"No API hash for {api_id}, skipping")
+            progress["skipped"] += 1
+            return
+        
+        for attempt in range(STARTUP_MAX_RETRIES + 1):
+            try:
+                async with semaphore:
+                    await self.get_client(api_id, api_hash, user.get("session_string"))
+                
+                progress["started"] += 1
+                logger.info(f"[SUCCESS] Bot started for {api_id}")
+                return
+            
+            except errors.FloodWaitError as e:
+                if attempt >= STARTUP_MAX_RETRIES:
+                    logger.error(f"❌ Failed to start bot {api_id}: flood wait after {attempt + 1} attempts")
+                    break
+                # Semaphore ছেড়ে দিয়ে অপেক্ষা, যাতে অন্য account গুলো চলতে থাকে
+                delay = e.seconds + random.uniform(1, 5) * (attempt + 1)
+                logger.warning(f"[WARNING] Flood wait for {api_id}, retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+            
+            except Exception as e:
+                logger.error(f"❌ Failed to start bot {api_id}: {e}")
+                break
+        
+        progress["failed"] += 1
 
     async def initial_startup_from_db(self):
         """Start all bots from database on server startup"""
+        progress = self.startup_progress
         try:
             logger.info("[STARTUP] Starting bots from database...")
-            sessions = await db.get_all_sessions()
-            logger.info(f"Found {len(sessions)} sessions in database")
+            progress.update({
+                "state": "running",
+                "started_at": datetime.utcnow().isoformat(),
+                "finished_at": None
+            })
             
-            for session_data in sessions:
-                api_id = session_data.get("api_id")
-                if not api_id:
-                    continue
-                
-                try:
-                    # Get API hash
-                    api_hash = await db.get_api_hash(api_id)
-                    if not api_hash:
-                        logger.warning(f"No API hash for {api_id}, skipping")
-                        continue
-                    
-                    # Start bot
-                    await self.get_client(api_id, api_hash)
-                    logger.info(f"[SUCCESS] Bot started for {api_id}")
-                    
-                except Exception as e:
-                    logger.error(f"❌ Failed to start bot {api_id}: {e}")
+            # Client connect হওয়ার আগে, যাতে restart এর পরে কেউ দ্বিতীয়বার auto-reply না পায়
+            try:
+                await self.cooldowns.load()
+            except Exception as e:
+                logger.error(f"Error loading cooldowns: {e}")
             
-            logger.info("[SUCCESS] All bots processed")
+            # একটি projected cursor, batch আসার সাথে সাথে boot শুরু হয়।
+            # Sharding চালু থাকলে শুধু এই worker এর slice
+            semaphore = asyncio.Semaphore(STARTUP_CONCURRENCY)
+            boots = []
+            async for record in db.iter_boot_records(sharding.owns):
+                boots.append(asyncio.create_task(self._boot_session(record, semaphore)))
+                progress["total"] = len(boots)
+            logger.info(f"Found {len(boots)} sessions in database")
+            
+            await asyncio.gather(*boots)
+            
+            progress["state"] = "done"
+            logger.info(f"[SUCCESS] All bots processed ({progress['started']} started, {progress['failed']} failed)")
         except Exception as e:
+            progress["state"] = "error"
             logger.error(f"CRITICAL STARTUP ERROR: {e}")
+        finally:
+            progress["finished_at"] = datetime.utcnow().isoformat()
+
+    def _get_send_bucket(self, api_id: str) -> TokenBucket:
+        if api_id not in self.send_buckets:
+            self.send_buckets[api_id] = TokenBucket()
+        return self.send_buckets[api_id]
+
+    async def _send_throttled(self, api_id: str, client, target, message: str) -> dict:
+        """Send one message through the account's token bucket, retrying on FloodWait"""
+        bucket = self._get_send_bucket(api_id)
+        for attempt in range(SEND_MAX_RETRIES + 1):
+            await bucket.acquire()
+            try:
+                await client.send_message(target, message)
+                return {"target": target, "status": "sent", "attempts": attempt + 1}
+            except errors.FloodWaitError as e:
+                # পুরো account এর bucket থামিয়ে রাখুন, শুধু এই recipient নয়
+                bucket.pause(e.seconds)
+                logger.warning(f"[WARNING] Flood wait {e.seconds}s for {api_id} while sending to {target}")
+                error = f"FLOOD_WAIT {e.seconds}s"
+            except Exception as e:
+                return {"target": target, "status": "failed", "attempts": attempt + 1, "error": str(e)}
+        return {"target": target, "status": "failed", "attempts": SEND_MAX_RETRIES + 1, "error": error}
+
+    async def _send_scheduled(self, schedule: dict, date_str: str):
+        """Deliver one scheduled message to all its recipients, rate limited per account"""
+        owner_id = schedule.get("owner_id")
+        try:
+            # Hibernated account হলে এখানে আবার connect হবে
+            client = await self.get_client(owner_id)
+        except Exception as e:
+            logger.error(f"Scheduler could not get client for {owner_id}: {e}")
+            return
+        
+        message = schedule.get("message", "")
+        targets = list(schedule.get("chat_ids", [])) + list(schedule.get("usernames", []) or [])
+        semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+        
+        async def deliver(target):
+            async with semaphore:
+                return await self._send_throttled(owner_id, client, target, message)
+        
+        started = time.time()
+        results = await asyncio.gather(*(deliver(target) for target in targets))
+        sent = sum(1 for r in results if r["status"] == "sent")
+        logger.info(f"📨 Scheduled message {schedule['_id']} for {owner_id}: {sent}/{len(results)} sent in {time.time() - started:.1f}s")
+        
+        # Mark as sent with per-recipient status
+        await db.mark_scheduled_message_sent(str(schedule["_id"]), date_str, results)
+
+    def _dispatch_scheduled(self, schedule: dict, date_str: str):
+        """Run a delivery in the background so one large broadcast does not block other owners"""
+        task = asyncio.create_task(self._send_scheduled(schedule, date_str))
+        self.delivery_tasks.add(task)
+        task.add_done_callback(self.delivery_tasks.discard)
 
     async def scheduler_loop(self):
-        """Background task for scheduled messages"""
+        """Background task for scheduled messages - sleeps until the next due schedule"""
         logger.info("[SCHEDULER] Starting scheduler loop...")
+        queue = self.schedule_queue
         
+        # একবারই সব active schedule load, পরে route থেকে incremental update
         while True:
             try:
-                now = datetime.now()
-                current_time = now.strftime("%H:%M")
-                current_date = now.strftime("%Y-%m-%d")
-                
                 schedules = await db.get_all_active_scheduled_messages()
-                
+                now = datetime.now()
                 for schedule in schedules:
-                    if schedule.get("time") == current_time:
-                        owner_id = schedule.get("owner_id")
-                        last_sent = schedule.get("last_sent_date")
-                        
-                        if last_sent != current_date and owner_id in self.active_bots:
-                            client = self.active_bots[owner_id]
-                            message = schedule.get("message", "")
-                            chat_ids = schedule.get("chat_ids", [])
-                            usernames = schedule.get("usernames", [])
-                            
-                            # Send to chat IDs
-                            for chat_id in chat_ids:
-                                try:
-                                    await client.send_message(chat_id, message)
-                                    logger.info(f"📨 Scheduled message sent to {chat_id}")
-                                except Exception as e:
-                                    logger.error(f"Error sending to {chat_id}: {e}")
-                            
-                            # Send to usernames
-                            for username in usernames:
-                                try:
-                                    await client.send_message(username, message)
-                                    logger.info(f"📨 Scheduled message sent to {username}")
-                                except Exception as e:
-                                    logger.error(f"Error sending to {username}: {e}")
-                            
-                            # Mark as sent
-                            await db.mark_scheduled_message_sent(str(schedule["_id"]), current_date)
+                    if sharding.owns(schedule.get("owner_id")):
+                        queue.upsert(schedule, now)
+                logger.info(f"[SCHEDULER] Loaded {len(queue)} schedules")
+                break
+            except Exception as e:
+                logger.error(f"Scheduler load error: {e}")
+                await asyncio.sleep(60)
+        
+        while True:
+            try:
+                queue.changed.clear()
+                delay = queue.seconds_until_next(datetime.now())
+                # Wall clock বদলালে (NTP, DST) ধরার জন্য সর্বোচ্চ ৫ মিনিট ঘুম
+                timeout = 300 if delay is None else min(delay, 300)
+                try:
+                    await asyncio.wait_for(queue.changed.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
                 
-                await asyncio.sleep(60)  # Check every minute
+                for schedule, fire_at in queue.pop_due(datetime.now()):
+                    date_str = fire_at.strftime("%Y-%m-%d")
+                    self._dispatch_scheduled(schedule, date_str)
+                    schedule["last_sent_date"] = date_str
+                    queue.upsert(schedule, datetime.now())
                 
             except Exception as e:
                 logger.error(f"Scheduler error: {e}")
                 await asyncio.sleep(60)
 
+    # --- Scheduled message actions (sharding এ owner worker এ route হয়) ---
+    async def get_scheduled_messages(self, api_id: str):
+        return await db.get_scheduled_messages(api_id)
+
+    async def save_scheduled_message(self, api_id: str, data: dict):
+        msg_id = await db.add_scheduled_message(api_id, data)
+        schedule = await db.get_scheduled_message(api_id, msg_id)
+        if schedule:
+            self.schedule_queue.upsert(schedule, datetime.now())
+        else:
+            self.schedule_queue.remove(msg_id)
+        return True
+
+    async def delete_scheduled_message(self, api_id: str, msg_id: str):
+        await db.delete_scheduled_message(api_id, msg_id)
+        self.schedule_queue.remove(msg_id)
+        return True
+
+    async def invalidate_owner_caches(self, api_id: str):
+        db.invalidate_owner_caches(api_id)
+        return True
+
+    async def get_status(self) -> dict:
+        return {
+            "startup": self.startup_progress,
+            "active": list(self.active_bots),
+            "hibernated": list(self.hibernated)
+        }
+
+    async def _has_reply_duties(self, api_id: str) -> bool:
+        """Active auto-reply or keyword rules need a live connection to receive messages"""
+        settings = await db.get_settings(api_id)
+        if not settings.get("active", True):
+            return False
+        if settings.get("auto_reply_text"):
+            return True
+        return len(await db.get_keyword_matcher(api_id)) > 0
+
+    async def hibernate(self, api_id: str):
+        """Disconnect an idle client; get_client() reconnects it from session_string"""
+        async with self._get_lock(api_id):
+            client = self.active_bots.pop(api_id, None)
+            self.last_used.pop(api_id, None)
+            # নতুন client object এ handler আবার attach করতে হবে
+            self.message_handlers.pop(api_id, None)
+            if client is None:
+                return
+            try:
+                if client.is_connected():
+                    await client.disconnect()
+            except Exception as e:
+                logger.error(f"Error disconnecting {api_id} for hibernation: {e}")
+            self.hibernated.add(api_id)
+            logger.info(f"[HIBERNATE] Bot {api_id} hibernated")
+
+    @staticmethod
+    def _memory_mb() -> Optional[float]:
+        """Current RSS in MB (Linux only)"""
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except Exception:
+            return None
+
+    async def _hibernation_candidates(self):
+        """Active accounts without reply duties, least recently used first"""
+        for api_id in list(self.last_used):
+            if api_id in self.active_bots and not await self._has_reply_duties(api_id):
+                yield api_id
+
+    async def hibernation_loop(self):
+        """Background task: hibernate idle accounts and enforce the LRU caps"""
+        if not (HIBERNATE_IDLE_SECONDS or MAX_ACTIVE_BOTS or MAX_BOT_MEMORY_MB):
+            return
+        logger.info("[HIBERNATE] Starting hibernation loop...")
+        
+        while True:
+            await asyncio.sleep(HIBERNATE_CHECK_INTERVAL)
+            try:
+                now = time.time()
+                memory = self._memory_mb() if MAX_BOT_MEMORY_MB else None
+                memory_evictions = HIBERNATE_MEMORY_STEP if memory is not None and memory > MAX_BOT_MEMORY_MB else 0
+                if memory_evictions:
+                    logger.warning(f"[HIBERNATE] RSS {memory:.0f}MB over {MAX_BOT_MEMORY_MB}MB")
+                async for api_id in self._hibernation_candidates():
+                    over_count = MAX_ACTIVE_BOTS and len(self.active_bots) > MAX_ACTIVE_BOTS
+                    over_memory = memory_evictions > 0
+                    idle = HIBERNATE_IDLE_SECONDS and now - self.last_used.get(api_id, now) > HIBERNATE_IDLE_SECONDS
+                    
+                    if over_count or over_memory or idle:
+                        await self.hibernate(api_id)
+                        if over_memory:
+                            memory_evictions -= 1
+                    elif not HIBERNATE_IDLE_SECONDS:
+                        # শুধু cap চালু থাকলে cap এর নিচে নামার পর আর দেখার দরকার নেই
+                        break
+            except Exception as e:
+                logger.error(f"Hibernation loop error: {e}")
+
+    async def cooldown_loop(self):
+        await self.cooldowns.run()
+
+    async def login_flush_loop(self):
+        await db.user_login_flush_loop()
+
     async def stop_all(self):
         """Stop all bots"""
+        try:
+            await self.cooldowns.flush()
+        except Exception as e:
+            logger.error(f"Error flushing cooldowns: {e}")
+        await db.flush_user_logins()
         for api_id, client in self.active_bots.items():
             try:
                 if client.is_connected():
@@ -592,7 +1438,11 @@ class BotManager:
             except Exception as e:
                 logger.error(f"Error disconnecting {api_id}: {e}")
 
-bot_manager = BotManager()
+if sharding.is_front():
+    bot_manager = sharding.ShardedBotManager()
+    bot_manager.on_event = lambda api_id, message: manager.send_to(api_id, message)
+else:
+    bot_manager = BotManager()
 
 # --- Auth Helpers ---
 def create_access_token(data: dict):
@@ -602,6 +1452,19 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+_verified_tokens = TokenCache(TOKEN_CACHE_SIZE)
+
+def verify_token(token: str) -> Optional[dict]:
+    """Claims of a validly signed, unexpired token; repeat tokens skip jwt.decode"""
+    payload = _verified_tokens.get(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+        _verified_tokens.set(token, payload)
+    return payload
+
 async def get_current_admin(request: Request):
     if not await db.admin_exists():
         return "Unclaimed_Owner"
@@ -610,31 +1473,35 @@ async def get_current_admin(request: Request):
     if not token:
         raise HTTPException(status_code=401, detail="Authentication required")
     
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username or payload.get("type") != "admin":
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return username
-    except JWTError:
+    payload = verify_token(token)
+    if payload is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    username = payload.get("sub")
+    if not username or payload.get("type") != "admin":
         raise HTTPException(status_code=401, detail="Invalid token")
+    return username
+
+def decode_user_token(token: Optional[str]) -> Optional[str]:
+    """Return the api_id of a valid user token, else None"""
+    if not token:
+        return None
+    payload = verify_token(token)
+    if payload is None:
+        return None
+    api_id = payload.get("sub")
+    if not api_id or payload.get("type") != "user":
+        return None
+    return api_id
 
 async def get_current_user(request: Request):
     token = request.cookies.get("user_token")
     if not token:
         raise HTTPException(status_code=401, detail="Authentication required")
     
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        api_id = payload.get("sub")
-        token_type = payload.get("type")
-        
-        if not api_id or token_type != "user":
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        return api_id
-    except JWTError:
+    api_id = decode_user_token(token)
+    if not api_id:
         raise HTTPException(status_code=401, detail="Invalid token")
+    return api_id
 # lifespan
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -650,14 +1517,20 @@ async def lifespan(app: FastAPI):
         else:
             print("DB Initialized.")
         
-        # Load and start all bots from DB
+        db.start_change_stream_listener()
+        
+        # Bots background এ start হয়, HTTP সাথে সাথে serve শুরু করে
         print("Starting Bots from DB...")
-        await bot_manager.initial_startup_from_db()
-        print("Bots Started.")
+        asyncio.create_task(bot_manager.initial_startup_from_db())
+        print("Bot startup running in background (see /api/admin/startup-status).")
 
         # Start Scheduler
         asyncio.create_task(bot_manager.scheduler_loop())
         print("Scheduler Started.")
+        
+        asyncio.create_task(bot_manager.hibernation_loop())
+        asyncio.create_task(bot_manager.cooldown_loop())
+        asyncio.create_task(bot_manager.login_flush_loop())
 
         print("--- APPLICATION READY ---")
         yield
@@ -685,6 +1558,10 @@ app = FastAPI(
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.exception_handler(db.PasswordHashBusy)
+async def password_hash_busy_handler(request: Request, exc: db.PasswordHashBusy):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
 # --- Models ---
 class AdminSetupRequest(BaseModel):
     username: str
@@ -767,30 +1644,55 @@ async def check_admin_status(request: Request):
     token = request.cookies.get("admin_token")
     if not token:
         raise HTTPException(status_code=401, detail="Authentication required")
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        
-        # Check database for actual status to prevent stale JWT redirects
-        user = db.admin_collection.find_one({"username": username})
-        must_change = user.get("must_change_password", False) if user else payload.get("must_change", False)
-        
-        return {
-            "username": username,
-            "must_change": must_change
-        }
-    except JWTError:
+    payload = verify_token(token)
+    if payload is None:
         raise HTTPException(status_code=401, detail="Invalid token")
+    username = payload.get("sub")
+    
+    # Check database for actual status to prevent stale JWT redirects
+    user = await db.get_admin(username)
+    must_change = user.get("must_change_password", False) if user else payload.get("must_change", False)
+    
+    return {
+        "username": username,
+        "must_change": must_change
+    }
 
 @app.get("/api/admin/users")
 async def get_all_users_admin(admin: str = Depends(get_current_admin)):
     users = await db.get_all_users()
-    active_ids = bot_manager.active_bots.keys()
+    status = await bot_manager.get_status()
+    active_ids = set(status["active"])
+    hibernated_ids = set(status["hibernated"])
     
     for user in users:
         user['is_online'] = user['api_id'] in active_ids
+        user['is_hibernated'] = user['api_id'] in hibernated_ids
         
-    return users
+    return {
+        "users": users,
+        "total": len(users),
+        "active_count": len(active_ids),
+        "hibernated_count": len(hibernated_ids)
+    }
+
+@app.get("/api/admin/startup-status")
+async def get_startup_status_admin(admin: str = Depends(get_current_admin)):
+    status = await bot_manager.get_status()
+    if "shards" in status:
+        return {**status["startup"], "shards": status["shards"]}
+    return status["startup"]
+
+@app.get("/api/admin/cache-stats")
+async def get_cache_stats_admin(admin: str = Depends(get_current_admin)):
+    stats = db.cache_stats()
+    if media_store is not None:
+        stats["media"] = media_store.stats()
+    if photo_store is not None:
+        stats["photos"] = photo_store.stats()
+    stats["photo_memory"] = photo_memory.stats()
+    stats["tokens"] = _verified_tokens.stats()
+    return stats
 
 @app.get("/api/admin/users/{api_id}/details")
 async def get_user_details_admin(api_id: str, admin: str = Depends(get_current_admin)):
@@ -920,6 +1822,12 @@ async def user_logout(response: Response):
     return {"status": "success"}
 
 # --- User Settings ---
+async def _sync_owner_caches(api_id: str):
+    """Front এ লেখা settings/keywords - owner worker এর নিজের cache copy বাদ দিতে হবে,
+    নাহলে auto-reply SETTINGS_CACHE_TTL পর্যন্ত পুরনো rule এ চলে"""
+    if sharding.is_front():
+        await bot_manager.invalidate_owner_caches(api_id)
+
 @app.get("/api/settings")
 async def get_user_settings(api_id: str = Depends(get_current_user)):
     return await db.get_settings(api_id)
@@ -930,6 +1838,7 @@ async def update_user_settings(
     api_id: str = Depends(get_current_user)
 ):
     await db.update_settings(api_id, settings.dict())
+    await _sync_owner_caches(api_id)
     return {"status": "success"}
 
 # --- Keywords ---
@@ -942,7 +1851,18 @@ async def add_user_keyword(
     req: KeywordRequest, 
     api_id: str = Depends(get_current_user)
 ):
-    await db.add_keyword(api_id, req.keyword, req.reply)
+    try:
+        await db.add_keyword(
+            api_id,
+            req.keyword,
+            req.reply,
+            match_type=req.match_type,
+            case_sensitive=req.case_sensitive,
+            priority=req.priority
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await _sync_owner_caches(api_id)
     return {"status": "success"}
 
 @app.delete("/api/keywords")
@@ -951,19 +1871,34 @@ async def delete_user_keyword(
     api_id: str = Depends(get_current_user)
 ):
     await db.delete_keyword(api_id, keyword)
+    await _sync_owner_caches(api_id)
     return {"status": "success"}
 
 # --- Chats ---
 @app.get("/api/chats")
-async def get_user_chats(api_id: str = Depends(get_current_user)):
-    return await bot_manager.get_dialogs(api_id)
+async def get_user_chats(
+    limit: int = 50,
+    offset: int = 0,
+    refresh: bool = False,
+    api_id: str = Depends(get_current_user)
+):
+    limit = max(1, min(limit, 200))
+    return await bot_manager.get_dialogs(api_id, limit=limit, offset=max(0, offset), refresh=refresh)
 
 @app.get("/api/chats/{chat_id}/messages")
 async def get_chat_messages(
     chat_id: int, 
+    limit: int = 50,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    offset_id: Optional[int] = None,
     api_id: str = Depends(get_current_user)
 ):
-    return await bot_manager.get_messages(api_id, chat_id)
+    # offset_id = Telethon এর নাম, before এর সমান
+    if before is None:
+        before = offset_id
+    limit = max(1, min(limit, 100))
+    return await bot_manager.get_messages(api_id, chat_id, limit=limit, before=before, after=after)
 
 @app.post("/api/chats/send")
 async def send_chat_message(
@@ -980,24 +1915,60 @@ async def send_chat_message_media(
     file: UploadFile = File(...),
     api_id: str = Depends(get_current_user)
 ):
-    # Save uploaded file
-    temp_dir = "static/uploads"
-    os.makedirs(temp_dir, exist_ok=True)
-    file_path = os.path.join(temp_dir, file.filename)
-    
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
-    
+    filename = os.path.basename(file.filename or "") or "file"
+    if sharding.is_front():
+        await _send_via_temp_file(api_id, chat_id, message, filename, _iter_upload(file))
+        return {"status": "success"}
+
+    file_size = file.size
+    if file_size is None:
+        # Starlette 0.27 এর UploadFile.seek শুধু offset নেয়, তাই underlying file এ
+        file_size = await asyncio.to_thread(file.file.seek, 0, os.SEEK_END)
+        await file.seek(0)
+    if not file_size:
+        raise HTTPException(status_code=400, detail="Empty file")
+
+    await bot_manager.send_media_stream(api_id, chat_id, message, file, file_size, filename)
+    return {"status": "success"}
+
+@app.post("/api/chats/send-media-stream")
+async def send_chat_media_stream(
+    request: Request,
+    chat_id: int,
+    filename: str,
+    message: str = "",
+    upload_id: Optional[str] = None,
+    api_id: str = Depends(get_current_user)
+):
+    """Raw file body (not multipart) piped straight into Telegram, no temp file"""
     try:
-        await bot_manager.send_message(api_id, chat_id, message, file_path)
+        file_size = int(request.headers.get("content-length", ""))
+    except ValueError:
+        raise HTTPException(status_code=411, detail="Content-Length required")
+    if file_size <= 0:
+        raise HTTPException(status_code=400, detail="Empty file")
+    filename = os.path.basename(filename) or "file"
+
+    if sharding.is_front():
+        await _send_via_temp_file(api_id, chat_id, message, filename, request.stream())
         return {"status": "success"}
+
+    await bot_manager.send_media_stream(
+        api_id, chat_id, message, _BodyReader(request.stream()), file_size, filename, upload_id
+    )
+    return {"status": "success"}
+
+async def _send_via_temp_file(api_id: str, chat_id: int, message: str, filename: str, chunks):
+    """Sharded fallback - stream can't cross the IPC boundary, so the worker reads a private temp file"""
+    temp_dir = tempfile.mkdtemp(prefix="upload-")
+    file_path = os.path.join(temp_dir, filename)
+    try:
+        with open(file_path, "wb") as buffer:
+            async for chunk in chunks:
+                await asyncio.to_thread(buffer.write, chunk)
+        await bot_manager.send_message(api_id, chat_id, message, file_path)
     finally:
-        # Cleanup
-        try:
-            os.remove(file_path)
-        except:
-            pass
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
 # --- Media ---
 @app.get("/api/photos/{peer_id}")
@@ -1008,22 +1979,104 @@ async def get_peer_photo(
     url = await bot_manager.get_profile_photo(api_id, peer_id)
     return {"url": url if url else None}
 
+@app.post("/api/photos/prefetch")
+async def prefetch_peer_photos(
+    req: Optional[PhotoPrefetchRequest] = None,
+    api_id: str = Depends(get_current_user)
+):
+    urls = await bot_manager.prefetch_photos(api_id, req.peer_ids if req else None)
+    return {"urls": urls}
+
+@app.get("/api/photos/{peer_id}/{photo_id}")
+async def get_peer_photo_thumbnail(
+    peer_id: int,
+    photo_id: int,
+    request: Request,
+    api_id: str = Depends(get_current_user)
+):
+    # Photo cache সব account এর মধ্যে shared, তাই আগে দেখুন এই account peer টি দেখতে পায় কিনা
+    # (সাধারণত entity cache থেকেই উত্তর আসে)
+    if not await bot_manager.can_view_photo(api_id, peer_id, photo_id):
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+    # URL এ photo_id থাকায় content কখনো বদলায় না - photo বদলালে URL বদলায়
+    etag = f'"{photo_id}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    key = f"{peer_id}:{photo_id}"
+    data = photo_memory.get(key)
+    if data is None:
+        path = await bot_manager.get_photo_path(api_id, peer_id, photo_id)
+        if not path or not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="Photo not found")
+        data = await asyncio.to_thread(read_bytes, path)
+        photo_memory.set(key, data)
+    return Response(content=data, media_type="image/jpeg", headers=headers)
+
+def _media_response(request: Request, info: dict, size: Optional[int], open_range) -> Response:
+    """200/206 streaming response; open_range(start, length) yields the bytes"""
+    headers = {
+        "Accept-Ranges": "bytes",
+        # Telegram media id এর content বদলায় না
+        "Cache-Control": "private, max-age=86400"
+    }
+    if info.get("filename"):
+        headers["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(info['filename'])}"
+
+    try:
+        byte_range = parse_range(request.headers.get("range"), size) if size else None
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        if size:
+            headers["Content-Length"] = str(size)
+        return StreamingResponse(open_range(0, size), media_type=info["mime_type"], headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        open_range(start, end - start + 1),
+        status_code=206,
+        media_type=info["mime_type"],
+        headers=headers
+    )
+
 @app.get("/api/media/{chat_id}/{message_id}")
 async def get_message_media(
     chat_id: int, 
     message_id: int, 
+    request: Request,
     api_id: str = Depends(get_current_user)
 ):
-    file_path = await bot_manager.download_media(api_id, chat_id, message_id)
-    if not file_path or not os.path.exists(file_path):
+    if sharding.is_front():
+        # Telethon client worker এ থাকে - worker disk cache এ নামায়, front সেখান থেকে পড়ে
+        info = await bot_manager.download_media(api_id, chat_id, message_id)
+        if not info or not os.path.exists(info["path"]):
+            raise HTTPException(status_code=404, detail="Media not found")
+        path = info["path"]
+        return _media_response(request, info, os.path.getsize(path), lambda start, length: iter_file(path, start, length))
+
+    info = await bot_manager.get_media_info(api_id, chat_id, message_id)
+    if not info:
         raise HTTPException(status_code=404, detail="Media not found")
-    
-    return FileResponse(file_path)
+
+    path = media_store.get(info["key"])
+    if path is not None:
+        return _media_response(request, info, os.path.getsize(path), lambda start, length: iter_file(path, start, length))
+
+    return _media_response(
+        request, info, info["size"],
+        lambda start, length: bot_manager.stream_media(api_id, chat_id, message_id, start, length)
+    )
 
 # --- Scheduled Messages ---
 @app.get("/api/scheduled-messages")
 async def get_scheduled_messages(api_id: str = Depends(get_current_user)):
-    return await db.get_scheduled_messages(api_id)
+    return await bot_manager.get_scheduled_messages(api_id)
 
 @app.post("/api/scheduled-messages")
 async def add_scheduled_message(
@@ -1033,7 +2086,7 @@ async def add_scheduled_message(
     data = req.dict()
     if data.get("id"):
         data["_id"] = data.pop("id")
-    await db.add_scheduled_message(api_id, data)
+    await bot_manager.save_scheduled_message(api_id, data)
     return {"status": "success"}
 
 @app.delete("/api/scheduled-messages/{msg_id}")
@@ -1041,18 +2094,26 @@ async def delete_scheduled_message(
     msg_id: str, 
     api_id: str = Depends(get_current_user)
 ):
-    await db.delete_scheduled_message(api_id, msg_id)
+    await bot_manager.delete_scheduled_message(api_id, msg_id)
     return {"status": "success"}
 
 # --- WebSocket ---
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    api_id = decode_user_token(websocket.cookies.get("user_token"))
+    if not api_id:
+        # 1008 = policy violation (not logged in)। accept এর আগে close করলে ASGI
+        # handshake এ 403 দেয় এবং browser শুধু 1006 দেখে, তাই আগে accept
+        await websocket.accept()
+        await websocket.close(code=1008)
+        return
+    
+    await manager.connect(websocket, api_id)
     try:
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        manager.disconnect(websocket, api_id)
 
 # --- Static Routes ---
 @app.get("/")
@@ -0,0 +1,159 @@
+"""
+Media disk cache - Telegram media একবার download করে content-addressed file
+হিসেবে রাখা হয়। মোট byte budget পার হলে least recently used file মুছে ফেলা হয়।
+"""
+
+import asyncio
+import hashlib
+import os
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+
+MEDIA_CACHE_DIR = os.environ.get("MEDIA_CACHE_DIR", "cache/media")
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get("MEDIA_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Profile photo thumbnail (ছোট jpeg) এর আলাদা store, যাতে বড় media এগুলোকে evict না করে
+PHOTO_CACHE_DIR = os.environ.get("PHOTO_CACHE_DIR", "cache/photos")
+PHOTO_CACHE_MAX_BYTES = int(os.environ.get("PHOTO_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+FILE_CHUNK_SIZE = 256 * 1024
+
+class DiskLRUCache:
+    """Content-addressed files in a directory, bounded by a byte budget"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._load()
+
+    def _load(self):
+        """Rebuild the LRU index from disk, oldest access first"""
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(".part"):
+                    # আগের process এর অসম্পূর্ণ download
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self.total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def digest(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, key: str) -> Optional[str]:
+        digest = self.digest(key)
+        path = self._path(digest)
+        if digest in self._entries and os.path.exists(path):
+            self._entries.move_to_end(digest)
+            # Restart এর পরে LRU order mtime থেকে ফেরত আসে
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return path
+        if digest in self._entries:
+            self.total_bytes -= self._entries.pop(digest)
+        self.misses += 1
+        return None
+
+    def temp_path(self, key: str) -> str:
+        path = self._path(self.digest(key))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return f"{path}.{uuid.uuid4().hex}.part"
+
+    def commit(self, key: str, temp_path: str) -> str:
+        """Move a finished download into the cache and evict to the budget"""
+        digest = self.digest(key)
+        path = self._path(digest)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+        if digest in self._entries:
+            self.total_bytes -= self._entries[digest]
+        self._entries[digest] = size
+        self._entries.move_to_end(digest)
+        self.total_bytes += size
+        self._evict(keep=digest)
+        return path
+
+    def _evict(self, keep: str = None):
+        while self.total_bytes > self.max_bytes and self._entries:
+            digest, size = next(iter(self._entries.items()))
+            if digest == keep:
+                break
+            self._entries.pop(digest)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(digest))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+def write_bytes(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def parse_range(header: Optional[str], size: int):
+    """Parse a single 'bytes=start-end' range; returns (start, end) inclusive,
+    None for no/unsupported range, or raises ValueError if unsatisfiable"""
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_str, _, end_str = header[6:].strip().partition("-")
+    try:
+        if start_str == "":
+            # Suffix range: শেষের N byte
+            length = int(end_str)
+            if length <= 0:
+                raise ValueError("Empty suffix range")
+            return max(0, size - length), size - 1
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+async def iter_file(path: str, start: int, length: int) -> AsyncIterator[bytes]:
+    """Read a byte range of a local file in chunks without blocking the loop"""
+    with open(path, "rb") as f:
+        await asyncio.to_thread(f.seek, start)
+        remaining = length
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,52 @@
+"""
+Admin password hashing - Argon2 ইচ্ছাকৃতভাবে CPU ও memory heavy, তাই hash/verify
+event loop এর বাইরে ছোট আলাদা pool এ চলে (argon2-cffi GIL ছেড়ে দেয়)। একসাথে
+কয়টি চলবে তার cap আছে, আর cap এ জায়গা না পেলে অপেক্ষা না করে
+PasswordHashBusy (HTTP 503)।
+
+এই module কোনো database connection খোলে না, তাই benchmark ও tool সরাসরি
+import করতে পারে।
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.environ.get("PASSWORD_HASH_QUEUE_TIMEOUT", "5"))
+
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+_hash_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="argon2"
+)
+_hash_slots: Optional[asyncio.Semaphore] = None
+
+class PasswordHashBusy(Exception):
+    """Raised when a password hash could not start within PASSWORD_HASH_QUEUE_TIMEOUT"""
+
+async def run_hash(fn, *args):
+    """Run a pwd_context call on the Argon2 pool, waiting at most PASSWORD_HASH_QUEUE_TIMEOUT for a slot"""
+    global _hash_slots
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PasswordHashBusy("Too many password checks in progress, please try again shortly")
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, functools.partial(fn, *args))
+    finally:
+        _hash_slots.release()
+
+async def hash_password(password: str) -> str:
+    return await run_hash(pwd_context.hash, password)
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    return await run_hash(pwd_context.verify, password, password_hash)
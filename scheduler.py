@@ -0,0 +1,123 @@
+"""
+Scheduled message queue - প্রতিটি active schedule এর পরের fire time একটি
+min-heap এ রাখা হয়, তাই scheduler loop ঠিক পরের due job পর্যন্ত ঘুমায়।
+
+Schedule document এর "time" হলো local "HH:MM", প্রতিদিন একবার পাঠানো হয়
+এবং "last_sent_date" ("YYYY-MM-DD") দিয়ে একই দিনে দ্বিতীয়বার পাঠানো আটকানো হয়।
+"""
+
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+# Missed fire (server sleep, restart, ধীর iteration) এর জন্য:
+#   skip - SCHEDULE_CATCHUP_GRACE সেকেন্ডের বেশি দেরি হলে পরের দিন পর্যন্ত বাদ
+#   once - আজকের missed fire সাথে সাথে একবার পাঠানো হয়
+SCHEDULE_CATCHUP = os.environ.get("SCHEDULE_CATCHUP", "skip").lower()
+SCHEDULE_CATCHUP_GRACE = int(os.environ.get("SCHEDULE_CATCHUP_GRACE", "60"))
+
+# প্রতি account এর send rate limit (Telegram FLOOD_WAIT এড়াতে)
+SEND_RATE_PER_SECOND = float(os.environ.get("SEND_RATE_PER_SECOND", "2"))
+SEND_BURST = int(os.environ.get("SEND_BURST", "5"))
+SEND_CONCURRENCY = int(os.environ.get("SEND_CONCURRENCY", "4"))
+SEND_MAX_RETRIES = int(os.environ.get("SEND_MAX_RETRIES", "3"))
+
+def next_fire_time(schedule: dict, now: datetime) -> Optional[datetime]:
+    """Next datetime schedule should fire at, or None if its time is invalid"""
+    try:
+        hour, minute = (int(part) for part in schedule.get("time", "").split(":"))
+        today_fire = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    except (ValueError, TypeError):
+        return None
+
+    if schedule.get("last_sent_date") == today_fire.strftime("%Y-%m-%d"):
+        return today_fire + timedelta(days=1)
+    if (now - today_fire).total_seconds() <= SCHEDULE_CATCHUP_GRACE:
+        return today_fire
+    if SCHEDULE_CATCHUP == "once":
+        return today_fire
+    return today_fire + timedelta(days=1)
+
+class ScheduleQueue:
+    """Min-heap of (fire time, schedule id) with lazy deletion of stale entries"""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._entries: Dict[str, Tuple[int, dict, datetime]] = {}
+        self._version = 0
+        self.changed = asyncio.Event()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def upsert(self, schedule: dict, now: datetime):
+        schedule_id = str(schedule["_id"])
+        fire_at = next_fire_time(schedule, now) if schedule.get("active", True) else None
+        if fire_at is None:
+            self.remove(schedule_id)
+            return
+
+        self._version += 1
+        self._entries[schedule_id] = (self._version, schedule, fire_at)
+        heapq.heappush(self._heap, (fire_at.timestamp(), self._version, schedule_id))
+        self.changed.set()
+
+    def remove(self, schedule_id: str):
+        if self._entries.pop(str(schedule_id), None) is not None:
+            self.changed.set()
+
+    def _prune(self):
+        while self._heap:
+            _, version, schedule_id = self._heap[0]
+            entry = self._entries.get(schedule_id)
+            if entry is not None and entry[0] == version:
+                return
+            heapq.heappop(self._heap)
+
+    def seconds_until_next(self, now: datetime) -> Optional[float]:
+        self._prune()
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - now.timestamp())
+
+    def pop_due(self, now: datetime) -> List[Tuple[dict, datetime]]:
+        """Remove and return every (schedule, fire time) that is due at now"""
+        due = []
+        while True:
+            self._prune()
+            if not self._heap or self._heap[0][0] > now.timestamp():
+                return due
+            _, _, schedule_id = heapq.heappop(self._heap)
+            _, schedule, fire_at = self._entries.pop(schedule_id)
+            due.append((schedule, fire_at))
+
+class TokenBucket:
+    """Async token bucket; pause() blocks all acquirers, e.g. for a FloodWait"""
+
+    def __init__(self, rate: float = SEND_RATE_PER_SECOND, burst: int = SEND_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
@@ -0,0 +1,340 @@
+"""
+Multi-process sharding - SHARD_COUNT > 1 হলে প্রতিটি worker process api_id গুলোর
+একটি consistent-hash slice এর Telethon client চালায়। FastAPI front process
+request গুলো local IPC (127.0.0.1 TCP, newline-delimited JSON) দিয়ে owner
+worker এ পাঠায় এবং worker এর WebSocket event গুলো front এ ফেরত আসে।
+
+প্রতিটি connection এর প্রথম line এ front এর তৈরি shared secret যায়, তাই একই
+host এর অন্য process worker এর BotManager method call করতে পারে না। কোনো
+worker মারা গেলে front তাকে আবার চালু করে।
+"""
+
+import asyncio
+import bisect
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SHARD_COUNT = int(os.environ.get("SHARD_COUNT", "1"))
+SHARD_BASE_PORT = int(os.environ.get("SHARD_BASE_PORT", "8100"))
+SHARD_VNODES = 64
+SHARD_CALL_TIMEOUT = float(os.environ.get("SHARD_CALL_TIMEOUT", "120"))
+SHARD_HEALTH_INTERVAL = float(os.environ.get("SHARD_HEALTH_INTERVAL", "5"))
+SHARD_AUTH_TIMEOUT = 5
+
+# Worker process এ SHARD_INDEX set থাকে
+SHARD_INDEX = int(os.environ["SHARD_INDEX"]) if os.environ.get("SHARD_INDEX") else None
+
+_STREAM_LIMIT = 16 * 1024 * 1024
+
+class HashRing:
+    """Consistent hash ring with virtual nodes; maps api_id -> shard index"""
+
+    def __init__(self, nodes: int, vnodes: int = SHARD_VNODES):
+        points = []
+        for node in range(nodes):
+            for v in range(vnodes):
+                points.append((self._hash(f"shard-{node}-{v}"), node))
+        points.sort()
+        self._keys = [p[0] for p in points]
+        self._nodes = [p[1] for p in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], "big")
+
+    def owner(self, key: str) -> int:
+        idx = bisect.bisect(self._keys, self._hash(str(key))) % len(self._keys)
+        return self._nodes[idx]
+
+_ring = HashRing(SHARD_COUNT) if SHARD_COUNT > 1 else None
+
+def is_worker() -> bool:
+    return SHARD_INDEX is not None
+
+def is_front() -> bool:
+    return SHARD_COUNT > 1 and not is_worker()
+
+def owns(api_id: str) -> bool:
+    """True if this process should run api_id's client (always True without sharding)"""
+    if not is_worker():
+        return True
+    return _ring.owner(api_id) == SHARD_INDEX
+
+def _dumps(message: dict) -> bytes:
+    return json.dumps(message, default=str).encode() + b"\n"
+
+# --- Worker side ---
+class EventForwarder:
+    """Stands in for ConnectionManager inside a worker and pushes events to the front"""
+
+    def __init__(self):
+        self.writers: List[asyncio.StreamWriter] = []
+
+    async def send_to(self, api_id: str, message: dict):
+        payload = _dumps({"event": message, "api_id": api_id})
+        for writer in list(self.writers):
+            try:
+                writer.write(payload)
+                await writer.drain()
+            except Exception as e:
+                logger.error(f"Shard event forward error: {e}")
+                self.writers.remove(writer)
+
+async def serve(target: Any, port: int, secret: str, forwarder: Optional[EventForwarder] = None):
+    """Expose target's public coroutine methods over newline-delimited JSON.
+
+    The first line of every connection must be {"auth": secret}.
+    """
+
+    async def handle_request(request: dict, writer: asyncio.StreamWriter):
+        reply = {"id": request.get("id")}
+        try:
+            method = request["method"]
+            if method.startswith("_"):
+                raise AttributeError(f"Method {method} is not callable over IPC")
+            result = await getattr(target, method)(*request.get("args", []), **request.get("kwargs", {}))
+            # TelegramClient এর মতো object JSON এ পাঠানো যায় না
+            reply["result"] = result if isinstance(result, (dict, list, str, int, float, bool, type(None))) else None
+        except Exception as e:
+            reply["error"] = str(e)
+        try:
+            writer.write(_dumps(reply))
+            await writer.drain()
+        except Exception as e:
+            logger.error(f"Shard reply error: {e}")
+
+    async def authenticate(reader: asyncio.StreamReader) -> bool:
+        try:
+            line = await asyncio.wait_for(reader.readline(), SHARD_AUTH_TIMEOUT)
+            token = json.loads(line).get("auth")
+        except Exception:
+            return False
+        return isinstance(token, str) and hmac.compare_digest(token, secret)
+
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if not await authenticate(reader):
+            logger.warning("[SHARD] Rejected unauthenticated IPC connection")
+            writer.close()
+            return
+        if forwarder is not None:
+            forwarder.writers.append(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                asyncio.create_task(handle_request(json.loads(line), writer))
+        finally:
+            if forwarder is not None and writer in forwarder.writers:
+                forwarder.writers.remove(writer)
+            writer.close()
+
+    server = await asyncio.start_server(handle_connection, "127.0.0.1", port, limit=_STREAM_LIMIT)
+    async with server:
+        await server.serve_forever()
+
+def worker_main(index: int, count: int, port: int, secret: str):
+    """Entry point of a shard worker process"""
+    global SHARD_INDEX, SHARD_COUNT, _ring
+    SHARD_INDEX, SHARD_COUNT = index, count
+    _ring = HashRing(count)
+    os.environ["SHARD_INDEX"] = str(index)
+    os.environ["SHARD_COUNT"] = str(count)
+
+    # Env set করার পরে import, যাতে main একটি সাধারণ BotManager তৈরি করে
+    import main
+
+    async def run():
+        forwarder = EventForwarder()
+        main.manager = forwarder
+        bot_manager = main.bot_manager
+        main.db.start_change_stream_listener()
+        asyncio.create_task(bot_manager.initial_startup_from_db())
+        asyncio.create_task(bot_manager.scheduler_loop())
+        asyncio.create_task(bot_manager.hibernation_loop())
+        asyncio.create_task(bot_manager.cooldown_loop())
+        asyncio.create_task(bot_manager.login_flush_loop())
+        logger.info(f"[SHARD] Worker {index}/{count} listening on {port}")
+        try:
+            await serve(bot_manager, port, secret, forwarder)
+        finally:
+            await bot_manager.stop_all()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+# --- Front side ---
+class ShardClient:
+    """Front-process connection to one worker"""
+
+    def __init__(self, port: int, secret: str, on_event: Callable):
+        self.port = port
+        self.secret = secret
+        self.on_event = on_event
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+
+    async def connect(self, retries: int = 100, delay: float = 0.2):
+        for _ in range(retries):
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", self.port, limit=_STREAM_LIMIT)
+                writer.write(_dumps({"auth": self.secret}))
+                await writer.drain()
+                self.writer = writer
+                asyncio.create_task(self._read_loop(reader))
+                return
+            except OSError:
+                await asyncio.sleep(delay)
+        raise ConnectionError(f"Shard worker on port {self.port} did not come up")
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if "event" in message:
+                try:
+                    await self.on_event(message.get("api_id"), message["event"])
+                except Exception as e:
+                    logger.error(f"Shard event dispatch error: {e}")
+                continue
+            future = self.pending.pop(message.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(message)
+
+        self.writer = None
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Shard worker connection lost"))
+        self.pending.clear()
+
+    async def call(self, method: str, *args, **kwargs):
+        if self.writer is None:
+            raise ConnectionError("Shard worker not connected")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write(_dumps({"id": request_id, "method": method, "args": args, "kwargs": kwargs}))
+        await self.writer.drain()
+        try:
+            reply = await asyncio.wait_for(future, SHARD_CALL_TIMEOUT)
+        finally:
+            self.pending.pop(request_id, None)
+        if "error" in reply:
+            raise Exception(reply["error"])
+        return reply.get("result")
+
+class ShardedBotManager:
+    """Drop-in BotManager replacement for the front process.
+
+    Every public method whose first argument is an api_id is forwarded to the
+    worker that owns it on the hash ring.
+    """
+
+    def __init__(self, count: int = SHARD_COUNT, base_port: int = SHARD_BASE_PORT):
+        self.count = count
+        self.base_port = base_port
+        self.ring = HashRing(count)
+        self.processes: List[multiprocessing.Process] = []
+        self.clients: List[ShardClient] = []
+        self.on_event: Optional[Callable] = None
+        # প্রতি front run এ নতুন secret, worker এ spawn args দিয়ে যায় (env/argv তে নয়)
+        self.secret = secrets.token_hex(32)
+        self._stopping = False
+
+    async def _dispatch_event(self, api_id, message):
+        if self.on_event is not None:
+            await self.on_event(api_id, message)
+
+    def _spawn(self, index: int) -> multiprocessing.Process:
+        ctx = multiprocessing.get_context("spawn")
+        port = self.base_port + index
+        process = ctx.Process(target=worker_main, args=(index, self.count, port, self.secret), daemon=True)
+        process.start()
+        return process
+
+    async def start_workers(self):
+        for index in range(self.count):
+            self.processes.append(self._spawn(index))
+            self.clients.append(ShardClient(self.base_port + index, self.secret, self._dispatch_event))
+        await asyncio.gather(*(client.connect() for client in self.clients))
+        logger.info(f"[SHARD] {self.count} workers connected")
+        asyncio.create_task(self.supervise())
+
+    async def supervise(self):
+        """Respawn workers that died, so their slice of accounts comes back online"""
+        while not self._stopping:
+            await asyncio.sleep(SHARD_HEALTH_INTERVAL)
+            for index, process in enumerate(self.processes):
+                if self._stopping or process.is_alive():
+                    continue
+                logger.error(f"[SHARD] Worker {index} exited with code {process.exitcode}, restarting")
+                try:
+                    self.processes[index] = self._spawn(index)
+                    # নতুন worker নিজেই তার account গুলো DB থেকে boot করে
+                    await self.clients[index].connect()
+                    logger.info(f"[SHARD] Worker {index} restarted")
+                except Exception as e:
+                    logger.error(f"[SHARD] Could not restart worker {index}: {e}")
+
+    def client_for(self, api_id: str) -> ShardClient:
+        return self.clients[self.ring.owner(api_id)]
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        async def forward(api_id, *args, **kwargs):
+            return await self.client_for(api_id).call(name, api_id, *args, **kwargs)
+
+        return forward
+
+    # BotManager lifecycle - worker গুলো নিজেরাই startup, scheduler, hibernation ও cooldown চালায়
+    async def initial_startup_from_db(self):
+        await self.start_workers()
+
+    async def scheduler_loop(self):
+        return None
+
+    async def hibernation_loop(self):
+        return None
+
+    async def cooldown_loop(self):
+        return None
+
+    async def login_flush_loop(self):
+        return None
+
+    async def get_status(self) -> dict:
+        results = await asyncio.gather(*(c.call("get_status") for c in self.clients), return_exceptions=True)
+        merged = {"startup": {}, "active": [], "hibernated": [], "shards": []}
+        for index, status in enumerate(results):
+            if isinstance(status, Exception):
+                merged["shards"].append({"index": index, "error": str(status)})
+                continue
+            merged["active"].extend(status["active"])
+            merged["hibernated"].extend(status["hibernated"])
+            merged["shards"].append({"index": index, "startup": status["startup"]})
+            for key, value in status["startup"].items():
+                if isinstance(value, int):
+                    merged["startup"][key] = merged["startup"].get(key, 0) + value
+        return merged
+
+    async def stop_all(self):
+        self._stopping = True
+        await asyncio.gather(*(c.call("stop_all") for c in self.clients), return_exceptions=True)
+        for process in self.processes:
+            process.terminate()
@@ -192,7 +192,13 @@ async function changePassword() {
 async function loadUsers() {
     try {
         const response = await fetchWithAuth(`${API_BASE}/users`);
-        const users = await response.json();
+        const data = await response.json();
+        const users = data.users || [];
+
+        const summary = document.getElementById('users-summary');
+        if (summary) {
+            summary.textContent = `${data.total || 0} users · ${data.active_count || 0} active · ${data.hibernated_count || 0} hibernated`;
+        }
 
         const tbody = document.getElementById('users-table-body');
         tbody.innerHTML = '';
@@ -213,8 +219,11 @@ async function loadUsers() {
             tr.className = 'hover:bg-white/5 transition-colors';
 
             const isOnline = user.is_online || false;
-            const indicatorColor = isOnline ? 'bg-green-400 shadow-[0_0_8px_#4ade80]' : 'bg-red-400 shadow-[0_0_8px_#f87171]';
-            const statusText = isOnline ? 'Online' : 'Offline';
+            const isHibernated = !isOnline && (user.is_hibernated || false);
+            const indicatorColor = isOnline ? 'bg-green-400 shadow-[0_0_8px_#4ade80]'
+                : isHibernated ? 'bg-amber-400 shadow-[0_0_8px_#fbbf24]' : 'bg-red-400 shadow-[0_0_8px_#f87171]';
+            const statusText = isOnline ? 'Online' : isHibernated ? 'Hibernated' : 'Offline';
+            const statusColor = isOnline ? 'text-green-400' : isHibernated ? 'text-amber-400' : 'text-red-400';
 
             const displayName = user.first_name
                 ? `<span class="font-semibold">${user.first_name}</span> ${user.username ? '<span class="opacity-40 text-xs ml-1">@' + user.username + '</span>' : ''}`
@@ -230,7 +239,7 @@ async function loadUsers() {
                 <td class="p-4">
                     <div class="flex items-center gap-2">
                         <span class="w-2 h-2 rounded-full ${indicatorColor}"></span>
-                        <span class="text-xs font-bold uppercase tracking-wider ${isOnline ? 'text-green-400' : 'text-red-400'}">${statusText}</span>
+                        <span class="text-xs font-bold uppercase tracking-wider ${statusColor}">${statusText}</span>
                     </div>
                 </td>
                 <td class="p-4 text-xs opacity-60">${lastLogin}</td>
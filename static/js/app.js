@@ -141,8 +141,8 @@ function getHeaders() {
 }
 
 async function fetchWithAuth(url, options = {}) {
-    if (!options.headers) options.headers = getHeaders();
-    else Object.assign(options.headers, getHeaders());
+    // Caller এর header (যেমন upload এর Content-Type) default কে override করে
+    options.headers = Object.assign(getHeaders(), options.headers || {});
 
     const response = await fetch(url, options);
     if (response.status === 401) {
@@ -443,9 +443,12 @@ function connectWebSocket() {
         }
     };
 
-    socket.onclose = () => {
+    socket.onclose = (event) => {
         console.log("WebSocket disconnected");
 
+        // 1008 = server rejected the session cookie, reconnecting will not help
+        if (event.code === 1008) return;
+
         if (reconnectAttempts < MAX_RECONNECT_ATTEMPTS) {
             reconnectAttempts++;
             const delay = Math.min(3000, reconnectAttempts * 1000);
@@ -467,11 +470,23 @@ function handleWebSocketMessage(msg) {
         case 'message_sent':
             console.log("✅ Message sent successfully");
             break;
+        case 'upload_progress':
+            handleUploadProgress(msg);
+            break;
         default:
             console.log("Unknown message type:", msg.type);
     }
 }
 
+function handleUploadProgress(msg) {
+    const percent = msg.total ? Math.floor(msg.sent * 100 / msg.total) : 0;
+    if (percent >= 100) {
+        showToast(`✅ Uploaded ${msg.filename}`);
+    } else {
+        showToast(`⏫ Uploading ${msg.filename}: ${percent}%`);
+    }
+}
+
 function handleNewMessage(msg) {
     // 1. If currently in this chat, append the message
     if (currentChatId && (currentChatId == msg.chat_id)) {
@@ -689,6 +704,16 @@ async function loadKeywordsInsideModal() {
         <div class="space-y-4 mb-8">
             <div class="flex flex-col gap-3">
                 <input id="m-k-key" class="w-full bg-dark/50 border border-border rounded-xl px-5 py-3.5 focus:outline-none focus:border-brand transition-all" placeholder="Keyword (e.g., hello)">
+                <div class="flex gap-3 items-center">
+                    <select id="m-k-mode" class="flex-1 bg-dark/50 border border-border rounded-xl px-4 py-3 focus:outline-none focus:border-brand transition-all">
+                        <option value="substring">Contains</option>
+                        <option value="whole_word">Whole word</option>
+                        <option value="prefix">Starts with</option>
+                        <option value="exact">Exact message</option>
+                        <option value="regex">Regex</option>
+                    </select>
+                    <label class="flex items-center gap-2 text-sm opacity-80"><input id="m-k-case" type="checkbox"> Case sensitive</label>
+                </div>
                 <textarea id="m-k-reply" class="w-full bg-dark/50 border border-border rounded-xl px-5 py-3.5 focus:outline-none focus:border-brand transition-all custom-scrollbar h-32 resize-none" placeholder="Bot reply with line breaks..."></textarea>
             </div>
             <button onclick="addKeywordModal()" class="w-full bg-brand py-3.5 rounded-xl font-bold transition-all shadow-lg active:scale-95">Add New Keyword</button>
@@ -710,13 +735,19 @@ async function loadKeywordsInsideModal() {
         data.forEach(k => {
             const div = document.createElement('div');
             div.className = 'group flex justify-between items-start bg-white/5 p-4 rounded-2xl border border-white/5 hover:border-brand/40 transition-all';
+            // Keyword/reply (regex এর backslash সহ) text হিসেবে বসে এবং handler এ সরাসরি
+            // object যায়, inline JS string এ escape হয়ে বদলে যায় না
             div.innerHTML = `
-                <div onclick="editKeywordModal(\`${k.keyword}\`, \`${k.reply.replace(/`/g, '\\`').replace(/\n/g, '\\n')}\`)" class="flex-1 cursor-pointer">
-                    <b class="text-brand block mb-1">/${k.keyword}</b>
-                    <div class="text-[0.85rem] opacity-70 whitespace-pre-wrap leading-relaxed">${k.reply}</div>
+                <div class="k-edit flex-1 cursor-pointer">
+                    <b class="text-brand block mb-1">/<span class="k-keyword"></span> <span class="text-[0.7rem] opacity-50 font-normal">${k.match_type || 'substring'}${k.case_sensitive ? ' · Aa' : ''}</span></b>
+                    <div class="k-reply text-[0.85rem] opacity-70 whitespace-pre-wrap leading-relaxed"></div>
                 </div>
-                <button onclick="deleteKeywordModal('${k.keyword}')" class="w-8 h-8 flex items-center justify-center rounded-full bg-red-500/10 text-red-500 opacity-0 group-hover:opacity-100 transition-opacity hover:bg-red-500 hover:text-white ml-3 mt-1">×</button>
+                <button class="k-delete w-8 h-8 flex items-center justify-center rounded-full bg-red-500/10 text-red-500 opacity-0 group-hover:opacity-100 transition-opacity hover:bg-red-500 hover:text-white ml-3 mt-1">×</button>
             `;
+            div.querySelector('.k-keyword').textContent = k.keyword;
+            div.querySelector('.k-reply').textContent = k.reply;
+            div.querySelector('.k-edit').addEventListener('click', () => editKeywordModal(k));
+            div.querySelector('.k-delete').addEventListener('click', () => deleteKeywordModal(k.keyword));
             list.appendChild(div);
         });
     } catch (e) {
@@ -730,6 +761,9 @@ async function addKeywordModal() {
     const replyEl = document.getElementById('m-k-reply');
     const keyword = keyEl.value.trim();
     const reply = replyEl.value.trim();
+    const match_type = document.getElementById('m-k-mode').value;
+    const case_sensitive = document.getElementById('m-k-case').checked;
+    const priority = parseInt(keyEl.dataset.priority || '0', 10);
 
     if (!keyword || !reply) {
         showToast("❌ Both fields are required", "error");
@@ -739,17 +773,18 @@ async function addKeywordModal() {
     try {
         const res = await fetchWithAuth(`${API_BASE}/keywords`, {
             method: 'POST',
-            body: JSON.stringify({ keyword, reply })
+            body: JSON.stringify({ keyword, reply, match_type, case_sensitive, priority })
         });
 
         if (res.ok) {
             keyEl.value = '';
             replyEl.value = '';
+            delete keyEl.dataset.priority;
             loadKeywordsInsideModal();
             showToast("✅ Keyword added successfully");
         } else {
             const data = await res.json();
-            showToast(`❌ ${data.message || "Failed to add keyword"}`, "error");
+            showToast(`❌ ${data.detail || data.message || "Failed to add keyword"}`, "error");
         }
     } catch (e) {
         console.error(e);
@@ -778,9 +813,13 @@ async function deleteKeywordModal(keyword) {
     }
 }
 
-function editKeywordModal(keyword, reply) {
-    document.getElementById('m-k-key').value = keyword;
-    document.getElementById('m-k-reply').value = reply;
+function editKeywordModal(k) {
+    document.getElementById('m-k-key').value = k.keyword;
+    document.getElementById('m-k-reply').value = k.reply;
+    // Save এ rule যাতে substring এ ফিরে না যায়
+    document.getElementById('m-k-mode').value = k.match_type || 'substring';
+    document.getElementById('m-k-case').checked = !!k.case_sensitive;
+    document.getElementById('m-k-key').dataset.priority = k.priority || 0;
 }
 
 // --- Chat Functions ---
@@ -801,6 +840,7 @@ async function loadChats() {
             return;
         }
 
+        const chatElements = {};
         for (const chat of chats) {
             const el = document.createElement('div');
             el.className = 'flex items-center gap-4 p-4 cursor-pointer hover:bg-white/5 active:bg-white/10 transition-all border-b border-white/[0.02] group';
@@ -821,10 +861,11 @@ async function loadChats() {
 
             el.onclick = () => openChat(chat.id, chat.name);
             container.appendChild(el);
-
-            // Load profile photo
-            loadChatPhoto(chat.id, el);
+            chatElements[chat.id] = el;
         }
+
+        // সব profile photo এর URL একটি request এ
+        loadChatPhotos(chatElements);
     } catch (e) {
         console.error("Load chats error:", e);
         container.innerHTML = '<div class="text-center py-8 text-red-400">Error loading chats</div>';
@@ -852,15 +893,20 @@ function formatTime(dateString) {
     }
 }
 
-async function loadChatPhoto(chatId, chatElement) {
+async function loadChatPhotos(chatElements) {
     try {
-        const res = await fetchWithAuth(`${API_BASE}/photos/${chatId}`);
+        const res = await fetchWithAuth(`${API_BASE}/photos/prefetch`, {
+            method: 'POST',
+            body: JSON.stringify({ peer_ids: Object.keys(chatElements).map(Number) })
+        });
         const data = await res.json();
 
-        if (data.url) {
+        for (const [chatId, url] of Object.entries(data.urls || {})) {
+            const chatElement = chatElements[chatId];
+            if (!url || !chatElement) continue;
             const avatarDiv = chatElement.querySelector('.chat-avatar');
             if (avatarDiv) {
-                avatarDiv.innerHTML = `<img src="${data.url}" class="w-full h-full rounded-full object-cover border border-white/10" onerror="this.onerror=null; this.parentElement.innerHTML='${chatElement.querySelector('.font-semibold').innerText.charAt(0)}'">`;
+                avatarDiv.innerHTML = `<img src="${url}" loading="lazy" class="w-full h-full rounded-full object-cover border border-white/10" onerror="this.onerror=null; this.parentElement.innerHTML='${chatElement.querySelector('.font-semibold').innerText.charAt(0)}'">`;
             }
         }
     } catch (e) {
@@ -906,10 +952,51 @@ function closeChat() {
     if (chatPanel) chatPanel.classList.remove('active');
 }
 
+// Scroll-back pagination state
+let oldestMessageId = null;
+let loadingOlder = false;
+let noOlderMessages = false;
+
+async function loadOlderMessages() {
+    const container = document.getElementById('messages-container');
+    if (!container || loadingOlder || noOlderMessages || !oldestMessageId || !currentChatId) return;
+
+    loadingOlder = true;
+    const chatId = currentChatId;
+    try {
+        const res = await fetchWithAuth(`${API_BASE}/chats/${chatId}/messages?before=${oldestMessageId}`);
+        const messages = await res.json();
+        if (chatId !== currentChatId) return;
+
+        if (messages.length === 0) {
+            noOlderMessages = true;
+            return;
+        }
+
+        // Keep the visible message in place while prepending
+        const previousHeight = container.scrollHeight;
+        for (let i = messages.length - 1; i >= 0; i--) {
+            appendMessage(messages[i], true);
+        }
+        oldestMessageId = messages[0].id;
+        container.scrollTop += container.scrollHeight - previousHeight;
+    } catch (e) {
+        console.error("Load older messages error:", e);
+    } finally {
+        loadingOlder = false;
+    }
+}
+
 async function loadMessages(chatId) {
     const container = document.getElementById('messages-container');
     if (!container) return;
 
+    oldestMessageId = null;
+    noOlderMessages = false;
+    container.onscroll = () => {
+        if (container.scrollTop < 80) loadOlderMessages();
+    };
+
     container.innerHTML = '<div class="flex items-center justify-center h-full opacity-40 animate-pulse italic">Loading messages...</div>';
 
     try {
@@ -924,6 +1011,7 @@ async function loadMessages(chatId) {
 
         // Messages come in reverse order (oldest first), we need to show newest at bottom
         messages.forEach(msg => appendMessage(msg));
+        oldestMessageId = messages[0].id;
         scrollToBottom();
     } catch (e) {
         console.error("Load messages error:", e);
@@ -931,7 +1019,7 @@ async function loadMessages(chatId) {
     }
 }
 
-function appendMessage(msg) {
+function appendMessage(msg, prepend = false) {
     const container = document.getElementById('messages-container');
     const isOutgoing = msg.outgoing;
 
@@ -964,7 +1052,11 @@ function appendMessage(msg) {
             </div>
         </div>
     `;
-    container.appendChild(div);
+    if (prepend) {
+        container.insertBefore(div, container.firstChild);
+    } else {
+        container.appendChild(div);
+    }
 }
 
 function scrollToBottom() {
@@ -1009,11 +1101,15 @@ async function sendChatMessage() {
 
     try {
         if (selectedFile) {
-            // Send with file
-            const formData = new FormData();
-            formData.append('chat_id', currentChatId);
-            formData.append('message', text);
-            formData.append('file', selectedFile);
+            // Send with file - raw body, server streams it straight to Telegram
+            const file = selectedFile;
+            const uploadId = `${Date.now()}-${Math.random().toString(36).slice(2, 8)}`;
+            const params = new URLSearchParams({
+                chat_id: currentChatId,
+                message: text,
+                filename: file.name,
+                upload_id: uploadId
+            });
 
             // Optimistic UI update
             appendMessage({
@@ -1025,10 +1121,12 @@ async function sendChatMessage() {
 
             clearFile();
 
-            await fetchWithAuth(`${API_BASE}/chats/send-media`, {
+            const response = await fetchWithAuth(`${API_BASE}/chats/send-media-stream?${params}`, {
                 method: 'POST',
-                body: formData
+                headers: { 'Content-Type': file.type || 'application/octet-stream' },
+                body: file
             });
+            if (!response.ok) throw new Error(`Upload failed (${response.status})`);
 
         } else {
             // Send text only
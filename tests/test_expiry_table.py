@@ -0,0 +1,106 @@
+import math
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import ExpiryTable
+
+
+def stored(stamp, expires_at):
+    return int(stamp), math.ceil(expires_at)
+
+
+def check_against(table, model, now=None):
+    """Every live model entry must be in the table; expired ones may still linger until swept"""
+    for key, value in model.items():
+        got = table.get(key)
+        if now is not None and value[1] <= now:
+            assert got in (None, value)
+        else:
+            assert got == value
+
+
+def random_key(rng):
+    key = rng.randrange(-(1 << 62), 1 << 62)
+    return key or 1
+
+
+def test_set_get_matches_dict():
+    rng = random.Random(1)
+    table = ExpiryTable()
+    model = {}
+    keys = [random_key(rng) for _ in range(3000)]
+    for _ in range(20000):
+        key = rng.choice(keys)
+        stamp = rng.uniform(0, 1e6)
+        expires_at = stamp + rng.uniform(0, 1e4)
+        table.set(key, stamp, expires_at)
+        model[key] = stored(stamp, expires_at)
+    assert len(table) == len(model)
+    check_against(table, model)
+    for _ in range(1000):
+        key = random_key(rng)
+        assert table.get(key) == model.get(key)
+
+
+@pytest.mark.parametrize("slots", [None, 1, 7, 64])
+def test_sweep_matches_dict(slots):
+    rng = random.Random(slots or 0)
+    table = ExpiryTable()
+    model = {}
+    now = 0
+    for _ in range(40):
+        for _ in range(rng.randrange(0, 800)):
+            key = random_key(rng) if rng.random() < 0.7 or not model else rng.choice(list(model))
+            stamp = now + rng.uniform(0, 10)
+            expires_at = stamp + rng.uniform(1, 200)
+            table.set(key, stamp, expires_at)
+            model[key] = stored(stamp, expires_at)
+            # set() ও sweep() interleave করা, যাতে resize চলাকালীন sweep ও ধরা পড়ে
+            if slots is not None and rng.random() < 0.05:
+                table.sweep(now, slots)
+        now += rng.uniform(0, 150)
+        table.sweep(now, slots)
+        check_against(table, model, now)
+
+    # পুরো pass এর পর table ও dict হুবহু এক
+    table.sweep(now)
+    model = {key: value for key, value in model.items() if value[1] > now}
+    assert len(table) == len(model)
+    check_against(table, model)
+
+
+def test_sweep_shrinks_and_bounds_work():
+    table = ExpiryTable()
+    for key in range(1, 20001):
+        table.set(key, 0, 10 if key > 100 else 1000)
+    grown = table.capacity
+    while table.sweep(20, 256):
+        pass
+    table.sweep(20)
+    table.sweep(20)
+    assert len(table) == 100
+    assert table.capacity < grown
+    for key in range(1, 20001):
+        assert table.get(key) == ((0, 1000) if key <= 100 else None)
+
+
+def test_sweep_slot_budget_resumes():
+    table = ExpiryTable()
+    for key in range(1, 1001):
+        table.set(key, 0, 5)
+    removed = table.sweep(10, 100)
+    assert 0 < removed < 1000
+    total = removed
+    while len(table):
+        total += table.sweep(10, 100)
+    assert total == 1000
+
+
+def test_zero_key_rejected():
+    with pytest.raises(ValueError):
+        ExpiryTable().set(0, 0, 1)